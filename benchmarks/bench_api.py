@@ -0,0 +1,210 @@
+"""Latency/throughput benchmark for the serving API.
+
+Drives /predict, /predict/batch, /inventory/update and /live_stream either in
+process through an ASGI client (no network, measures the app itself) or over
+real uvicorn workers (measures the full HTTP stack), and writes JSON results
+that can be compared across runs:
+
+    python benchmarks/bench_api.py --mode asgi --requests 5000 --out before.json
+    python benchmarks/bench_api.py --mode uvicorn --workers 4 --concurrency 64 --compare before.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVING_DIR = os.path.join(ROOT, "serving")
+SCENARIOS = ["predict", "predict_batch", "inventory_update", "live_stream"]
+PARTS = ["PART_BRAKE_PAD", "PART_ENGINE_BELT", "PART_FILTER"]
+
+
+def reading(fleet_size: int) -> dict:
+    return {
+        "vehicle_id": f"BENCH-{random.randrange(fleet_size)}",
+        "sensor_1": random.uniform(5500, 6500),
+        "sensor_2": random.uniform(0.0, 0.6),
+        "sensor_3": random.uniform(320, 420),
+        "timestamp": time.strftime("%H:%M:%S"),
+    }
+
+
+def make_request(scenario: str, args):
+    """(method, path, params, json body) for one request of `scenario`"""
+    if scenario == "predict":
+        return "POST", "/predict", None, reading(args.fleet_size)
+    if scenario == "predict_batch":
+        return "POST", "/predict/batch", None, {"readings": [reading(args.fleet_size) for _ in range(args.batch_size)]}
+    if scenario == "inventory_update":
+        return "POST", "/inventory/update", {"part_name": random.choice(PARTS)}, {"quantity": random.randint(0, 50)}
+    if scenario == "live_stream":
+        return "GET", "/live_stream", {"vehicle_id": f"BENCH-{random.randrange(args.fleet_size)}"}, None
+    raise ValueError(scenario)
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, args) -> dict:
+    latencies = []
+    errors = 0
+    remaining = args.requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, params, body = make_request(scenario, args)
+            t0 = time.perf_counter()
+            try:
+                resp = await client.request(method, path, params=params, json=body)
+                # /live_stream 404s for vehicles not seen yet; that is still a served request
+                if resp.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    per_request = args.batch_size if scenario == "predict_batch" else 1
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "readings_per_s": len(latencies) * per_request / elapsed if scenario.startswith("predict") else None,
+        "latency_ms": {
+            "mean": float(lat_ms.mean()),
+            "p50": float(np.percentile(lat_ms, 50)),
+            "p95": float(np.percentile(lat_ms, 95)),
+            "p99": float(np.percentile(lat_ms, 99)),
+            "max": float(lat_ms.max()),
+        },
+    }
+
+
+async def run_all(client: httpx.AsyncClient, args) -> dict:
+    results = {}
+    # Warm up so feature/fleet state exists and first-request costs are excluded
+    for _ in range(min(200, args.requests)):
+        await client.post("/predict", json=reading(args.fleet_size))
+    for scenario in args.scenarios:
+        results[scenario] = await run_scenario(client, scenario, args)
+        r = results[scenario]
+        print(f"📊 {scenario:<17} {r['requests_per_s']:>9,.0f} req/s  "
+              f"p50={r['latency_ms']['p50']:.2f}ms p95={r['latency_ms']['p95']:.2f}ms "
+              f"p99={r['latency_ms']['p99']:.2f}ms errors={r['errors']}")
+    return results
+
+
+# --- TARGETS ---
+@contextlib.asynccontextmanager
+async def asgi_client(args):
+    """In-process client: the app runs in this event loop, lifespan included"""
+    sys.path.insert(0, SERVING_DIR)
+    import app as serving_app
+
+    async with serving_app.app.router.lifespan_context(serving_app.app):
+        transport = httpx.ASGITransport(app=serving_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def uvicorn_client(args, state_dir: str):
+    """Spawn real uvicorn workers sharing a SQLite inventory and talk to them over TCP"""
+    port = free_port()
+    env = dict(os.environ, INVENTORY_BACKEND="sqlite", INVENTORY_PATH=os.path.join(state_dir, "inventory.db"))
+    cmd = [sys.executable, "-m", "uvicorn", "app:app", "--app-dir", SERVING_DIR,
+           "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, env=env, cwd=state_dir)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30.0) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            yield client
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def compare(current: dict, baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"\n🔍 Compared with {baseline_path}")
+    for scenario, r in current.items():
+        if scenario not in baseline:
+            continue
+        b = baseline[scenario]
+        change = (r["requests_per_s"] / b["requests_per_s"] - 1) * 100
+        print(f"   {scenario:<17} throughput {change:+.1f}%  "
+              f"p99 {b['latency_ms']['p99']:.2f} -> {r['latency_ms']['p99']:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serving API")
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (uvicorn mode)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=100, help="Readings per /predict/batch request")
+    parser.add_argument("--fleet-size", type=int, default=1000, help="Distinct vehicle ids")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to diff against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as state_dir:
+        # Keep the benchmark's inventory log/database out of the working tree
+        os.environ.setdefault("INVENTORY_PATH", os.path.join(state_dir, "inventory_state"))
+
+        async def go():
+            target = asgi_client(args) if args.mode == "asgi" else uvicorn_client(args, state_dir)
+            async with target as client:
+                return await run_all(client, args)
+
+        print(f"🚀 Benchmarking in {args.mode} mode, concurrency={args.concurrency}")
+        results = asyncio.run(go())
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": vars(args),
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results saved to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
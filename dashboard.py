@@ -2,6 +2,7 @@ import streamlit as st
 import requests
 import time
 import datetime
+import json
 
 API_URL = "http://localhost:8000"
 
@@ -52,14 +53,18 @@ if mode == "Manual Inspection":
         st.json(resp['inventory_snapshot'])
 
 elif mode == "Live NASA Data Stream":
-    st.info("Reading live data from 'serving/app.py'...")
+    st.info("Streaming live updates from 'serving/app.py'...")
     
-    # Auto-Refresh Loop
+    # Push feed: the API sends a snapshot, then only what changed (no polling).
+    # The at-risk table comes from the server's RUL index in every message, so the
+    # dashboard only holds the latest vehicle and never sorts the fleet itself.
     placeholder = st.empty()
-    
-    try:
-        live_data = requests.get(f"{API_URL}/live_stream").json()
-        
+    view = {"latest": None, "at_risk": [], "maintenance_count": 0, "inventory": {}}
+
+    def render():
+        live_data = view["latest"]
+        if live_data is None:
+            return
         with placeholder.container():
             c1, c2, c3 = st.columns(3)
             c1.metric("Vehicle ID", live_data['vehicle_id'])
@@ -69,14 +74,44 @@ elif mode == "Live NASA Data Stream":
             c2.metric("Vibration", f"{sensors.get('vib', 0):.3f}")
             
             c3.metric("RUL", live_data.get('prediction', {}).get('rul', 'N/A'))
+            c3.metric("Needs Maintenance", view["maintenance_count"])
             
             st.warning(f"System Action: {live_data['action']}")
             
+            st.subheader("Lowest RUL Vehicles")
+            st.table([
+                {"Vehicle": v['vehicle_id'], "RUL": v['prediction']['rul'], "Action": v['action']}
+                for v in view["at_risk"]
+            ])
+            
             st.subheader("Live Inventory Impact")
-            st.json(requests.get(f"{API_URL}/").json()['inventory'])
+            st.json(view["inventory"])
 
-        time.sleep(1)
-        st.rerun()
-        
+    try:
+        with requests.get(f"{API_URL}/stream/fleet", stream=True, timeout=(3, 60)) as resp:
+            event = None
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                payload = json.loads(line[5:])
+                if event == "snapshot":
+                    if payload['latest'].get('prediction'):
+                        view["latest"] = payload['latest']
+                    view["inventory"] = payload['inventory']
+                else:
+                    for v in payload['vehicles']:
+                        if v['vehicle_id'] == payload['last_vehicle_id']:
+                            view["latest"] = v
+                    view["inventory"].update(payload['inventory'])
+                view["at_risk"] = payload['at_risk']
+                view["maintenance_count"] = payload['maintenance_count']
+                render()
+        st.info("Stream closed by the API, reconnecting...")
     except Exception as e:
         st.error(f"Waiting for stream... {e}")
+    # Reconnect whether the feed failed or ended cleanly (e.g. API restart)
+    time.sleep(2)
+    st.rerun()
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# CONFIG
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+DATASETS = ["FD001", "FD002", "FD003", "FD004"]
+SPLITS = ["train", "test", "RUL"]
+
+# Raw layout: unit, cycle, 3 operational settings, 21 sensors
+N_SETTINGS = 3
+N_SENSORS = 21
+TABLE_COLUMNS = ["units", "cycles", "settings", "sensors"]
+INDEX_COLUMNS = ["engines", "offsets"]
+MANIFEST = "manifest.json"
+
+
+class EngineTable:
+    """Memory-mapped CMAPSS train/test table with a per-engine offset index.
+
+    Columns are typed arrays (`units`, `cycles` int32; `settings`, `sensors`
+    float32). Rows are grouped by engine, so `engine(unit)` is a zero-copy slice.
+    """
+
+    def __init__(self, name: str, columns: Dict[str, np.ndarray], engine_ids: np.ndarray, offsets: np.ndarray):
+        self.name = name
+        self.units = columns["units"]
+        self.cycles = columns["cycles"]
+        self.settings = columns["settings"]
+        self.sensors = columns["sensors"]
+        self.engine_ids = engine_ids
+        self.offsets = offsets
+        self._position = {int(u): i for i, u in enumerate(engine_ids)}
+
+    def __len__(self):
+        return len(self.units)
+
+    @property
+    def n_engines(self) -> int:
+        return len(self.engine_ids)
+
+    def rows(self, unit: int) -> slice:
+        i = self._position[unit]
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def engine(self, unit: int) -> Dict[str, np.ndarray]:
+        """All cycles of one engine as views into the memory-mapped columns"""
+        rows = self.rows(unit)
+        return {"cycles": self.cycles[rows], "settings": self.settings[rows], "sensors": self.sensors[rows]}
+
+
+# --- CACHE BUILD ---
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_manifest(cache_dir: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(cache_dir: str, manifest: dict):
+    tmp = os.path.join(cache_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(cache_dir, MANIFEST))
+
+
+def _save(cache_dir: str, name: str, column: str, array: np.ndarray):
+    # Write-then-rename so a reader never maps a half-written file
+    tmp = os.path.join(cache_dir, f"{name}.{column}.tmp.npy")
+    np.save(tmp, np.ascontiguousarray(array))
+    os.replace(tmp, os.path.join(cache_dir, f"{name}.{column}.npy"))
+
+
+def _cached_columns(name: str) -> List[str]:
+    return ["rul"] if name.startswith("RUL_") else TABLE_COLUMNS + INDEX_COLUMNS
+
+
+def _convert(src: str, cache_dir: str, name: str) -> int:
+    raw = np.loadtxt(src, dtype=np.float64, ndmin=2)
+    if name.startswith("RUL_"):
+        _save(cache_dir, name, "rul", raw[:, 0].astype(np.int32))
+        return len(raw)
+
+    # Group rows by engine (stable, so cycles keep their order) and index the groups
+    raw = raw[np.argsort(raw[:, 0], kind="stable")]
+    units = raw[:, 0].astype(np.int32)
+    starts = np.flatnonzero(np.r_[True, units[1:] != units[:-1]])
+    _save(cache_dir, name, "units", units)
+    _save(cache_dir, name, "cycles", raw[:, 1].astype(np.int32))
+    _save(cache_dir, name, "settings", raw[:, 2:2 + N_SETTINGS].astype(np.float32))
+    _save(cache_dir, name, "sensors", raw[:, 2 + N_SETTINGS:2 + N_SETTINGS + N_SENSORS].astype(np.float32))
+    _save(cache_dir, name, "engines", units[starts])
+    _save(cache_dir, name, "offsets", np.r_[starts, len(units)].astype(np.int64))
+    return len(raw)
+
+
+def ensure_cached(name: str, data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR, force: bool = False) -> bool:
+    """(Re)build the cache of one source file (e.g. "train_FD001") if it is missing or stale.
+
+    The manifest stores the source's SHA-256 plus size and mtime; the hash is only
+    recomputed when size or mtime changed. A missing column file forces a rebuild.
+    Returns True if the cache was rebuilt.
+    """
+    src = os.path.join(data_dir, f"{name}.txt")
+    if not os.path.exists(src):
+        raise FileNotFoundError(src)
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = _read_manifest(cache_dir)
+    entry = manifest.get(name)
+    stat = os.stat(src)
+    complete = all(os.path.exists(os.path.join(cache_dir, f"{name}.{c}.npy")) for c in _cached_columns(name))
+
+    if entry and complete and not force:
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return False
+        digest = _sha256(src)
+        if digest == entry["sha256"]:
+            entry["mtime_ns"] = stat.st_mtime_ns
+            _write_manifest(cache_dir, manifest)
+            return False
+    else:
+        digest = _sha256(src)
+
+    rows = _convert(src, cache_dir, name)
+    manifest = _read_manifest(cache_dir)
+    manifest[name] = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "rows": rows}
+    _write_manifest(cache_dir, manifest)
+    return True
+
+
+def build_cache(data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR, force: bool = False) -> List[str]:
+    """Convert every CMAPSS file present in `data_dir`. Returns the names that were (re)built."""
+    built = []
+    for dataset in DATASETS:
+        for split in SPLITS:
+            name = f"{split}_{dataset}"
+            if os.path.exists(os.path.join(data_dir, f"{name}.txt")):
+                if ensure_cached(name, data_dir, cache_dir, force):
+                    built.append(name)
+    return built
+
+
+# --- LOADERS ---
+def _open(cache_dir: str, name: str, column: str) -> np.ndarray:
+    return np.load(os.path.join(cache_dir, f"{name}.{column}.npy"), mmap_mode="r")
+
+
+def load_table(split: str, dataset: str, data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR) -> EngineTable:
+    """Memory-mapped train or test table, e.g. load_table("train", "FD001")"""
+    name = f"{split}_{dataset}"
+    ensure_cached(name, data_dir, cache_dir)
+    columns = {c: _open(cache_dir, name, c) for c in TABLE_COLUMNS}
+    return EngineTable(name, columns, np.load(os.path.join(cache_dir, f"{name}.engines.npy")),
+                       np.load(os.path.join(cache_dir, f"{name}.offsets.npy")))
+
+
+def load_rul(dataset: str, data_dir: str = DATA_DIR, cache_dir: str = CACHE_DIR) -> np.ndarray:
+    """True RUL at the end of each test engine, in engine order"""
+    name = f"RUL_{dataset}"
+    ensure_cached(name, data_dir, cache_dir)
+    return _open(cache_dir, name, "rul")
+
+
+def available(data_dir: str = DATA_DIR, split: str = "train", datasets: Optional[List[str]] = None) -> List[str]:
+    """Datasets whose `split` source file is present"""
+    return [d for d in (datasets or DATASETS) if os.path.exists(os.path.join(data_dir, f"{split}_{d}.txt"))]
+
+
+if __name__ == "__main__":
+    built = build_cache()
+    print(f"✅ Cache up to date in {CACHE_DIR}" + (f" (rebuilt: {', '.join(built)})" if built else ""))
@@ -1,6 +1,8 @@
 import os
 from kaggle.api.kaggle_api_extended import KaggleApi
 
+from cmapss import build_cache
+
 # CONFIG
 DATASET = "behrad3d/nasa-cmaps"
 TARGET_PATH = "data/"
@@ -16,9 +18,18 @@ def download_data():
     except Exception as e:
         print(f"❌ Error: {e}")
         print("Make sure 'kaggle.json' is in your root folder (auto-spare-parts-mlops/)")
+        return
+    # Outside the try: a conversion failure is not a download/credentials problem
+    prepare_cache()
+
+def prepare_cache():
+    # One-time conversion to memory-mappable .npy columns (rebuilt only if a source file changes)
+    built = build_cache(TARGET_PATH)
+    print(f"📦 Columnar cache ready ({len(built)} files converted)")
 
 if __name__ == "__main__":
     if not os.path.exists(os.path.join(TARGET_PATH, FILE_NAME)):
         download_data()
     else:
-        print("✅ Data already exists.")
\ No newline at end of file
+        print("✅ Data already exists.")
+        prepare_cache()
\ No newline at end of file
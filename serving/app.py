@@ -1,11 +1,69 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import time
 import uvicorn
-from fastapi import FastAPI, BackgroundTasks, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import random
-import time
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import numpy as np
+
+from broadcast import Broadcaster
+from consumer import SENSOR_TOPIC, KafkaSource, MicroBatchConsumer
+from features import FeatureStore
+from fleet_state import FleetState
+from inventory import open_inventory
+from metrics import REQUEST_SECONDS, STAGE_SECONDS, TimingMiddleware, render_gauges
+from model import TrendRULModel
+from model_registry import SHADOW_SECONDS, ModelManager, open_registry
+from supplier import FakeSupplier, SupplierDispatcher
+
+# --- STREAM INGESTION (optional, enabled by KAFKA_BOOTSTRAP_SERVERS) ---
+KAFKA_BOOTSTRAP_SERVERS = os.environ.get("KAFKA_BOOTSTRAP_SERVERS")
+KAFKA_GROUP_ID = os.environ.get("KAFKA_GROUP_ID", "serving")
+STREAM_MAX_BATCH = int(os.environ.get("STREAM_MAX_BATCH", "500"))
+STREAM_MAX_WAIT_MS = float(os.environ.get("STREAM_MAX_WAIT_MS", "50"))
+STREAM_MAX_PENDING = int(os.environ.get("STREAM_MAX_PENDING", "4"))
 
-app = FastAPI(title="Auto Spare Parts System", version="3.0")
+stream_consumer = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global stream_consumer
+    task = None
+    if KAFKA_BOOTSTRAP_SERVERS:
+        source = KafkaSource(SENSOR_TOPIC, KAFKA_BOOTSTRAP_SERVERS, KAFKA_GROUP_ID)
+        stream_consumer = MicroBatchConsumer(
+            source, score_stream_batch,
+            # A batch never holds more vehicles than the stores can, so it cannot fail on capacity
+            max_batch=min(STREAM_MAX_BATCH, batch_capacity()),
+            max_wait=STREAM_MAX_WAIT_MS / 1000,
+            max_pending=STREAM_MAX_PENDING,
+        )
+        task = asyncio.create_task(stream_consumer.run())
+        print(f"📥 Consuming '{SENSOR_TOPIC}' from {KAFKA_BOOTSTRAP_SERVERS}")
+    supplier_dispatcher.start()
+    broadcaster.start()
+    if MODEL_NAME:
+        # Background warm-up: the built-in model serves until the registry version is ready
+        model_manager.load(MODEL_NAME, MODEL_VERSION)
+    yield
+    await broadcaster.stop()
+    if task is not None:
+        stream_consumer.stop()
+        await task
+    await supplier_dispatcher.stop()
+    inventory.close()
+
+app = FastAPI(title="Auto Spare Parts System", version="3.0", lifespan=lifespan)
 
 # Enable CORS for Streamlit
 app.add_middleware(
@@ -15,9 +73,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TimingMiddleware)
+
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """FastAPI's 422, except that rejected NaN/inf inputs are echoed as text (they are not valid JSON)"""
+    errors = [
+        {**e, "input": repr(e["input"])} if isinstance(e.get("input"), float) and not math.isfinite(e["input"]) else e
+        for e in exc.errors()
+    ]
+    return JSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
 
-# --- GLOBAL STATE (For Dashboard Visualization) ---
-latest_vehicle_state = {
+# --- FLEET STATE (For Dashboard Visualization) ---
+# Latest prediction/action and recent history per vehicle, with RUL and maintenance indexes
+FLEET_CAPACITY = 20_000  # vehicles tracked by the feature store and the fleet state
+fleet_state = FleetState(capacity=FLEET_CAPACITY, history=60)
+
+WAITING_STATE = {
     "vehicle_id": "Waiting...",
     "timestamp": "N/A",
     "sensors": {},
@@ -25,97 +97,354 @@ latest_vehicle_state = {
     "action": "N/A"
 }
 
+# --- PUSH FEED ---
+FEED_AT_RISK = 10  # lowest-RUL vehicles carried by every snapshot and delta, from the RUL index
+# Feed versions restart at 0 with every process: version ETags carry this boot nonce so a
+# client's cached "v3" from before a restart (or from another worker) is never a match
+FEED_EPOCH = os.urandom(4).hex()
+_published_inventory = {}
+
+def build_fleet_delta(dirty: set):
+    """Changed vehicles since the last tick plus changed inventory counts, or None if nothing changed"""
+    global _published_inventory
+    vehicles = [state for state in map(fleet_state.latest, dirty) if state is not None]
+    current = inventory.snapshot()
+    inventory_changes = {p: q for p, q in current.items() if _published_inventory.get(p) != q}
+    _published_inventory = current
+    if not vehicles and not inventory_changes:
+        return None
+    return {
+        "last_vehicle_id": fleet_state.last_vehicle_id,
+        "maintenance_count": fleet_state.maintenance_count(),
+        "at_risk": fleet_state.lowest_rul(FEED_AT_RISK),
+        "vehicles": vehicles,
+        "inventory": inventory_changes,
+    }
+
+def build_fleet_snapshot():
+    return {
+        "last_vehicle_id": fleet_state.last_vehicle_id,
+        "latest": fleet_state.latest() or WAITING_STATE,
+        "at_risk": fleet_state.lowest_rul(FEED_AT_RISK),
+        "maintenance_count": fleet_state.maintenance_count(),
+        "inventory": inventory.snapshot(),
+    }
+
+# One serialized delta per tick is shared by every subscriber
+broadcaster = Broadcaster(build_fleet_delta, build_fleet_snapshot, interval=0.5)
+
+def etag_response(request: Request, body: bytes, etag: str) -> Response:
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
+
+def json_etag_response(request: Request, payload: dict) -> Response:
+    """JSON response with a content-hash ETag; answers 304 when the client already has it"""
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    return etag_response(request, body, f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+
 # --- DATABASE ---
-inventory_db = {
-    "PART_BRAKE_PAD": 5,
-    "PART_ENGINE_BELT": 10,
-    "PART_FILTER": 20
-}
+# "memory": per-part locks + append-only log/snapshots in INVENTORY_PATH (one worker).
+# "sqlite": WAL database at INVENTORY_PATH shared between processes. Only stock is shared:
+# feature store, fleet state, feed and dispatcher are per process, so run one worker per
+# instance (sticky routing by vehicle_id to scale out).
+# Reservations can block (SQLite lock waits, log flush/fsync, snapshots), so they run in
+# the threadpool; both stores are thread-safe. Reads never wait on writers and stay inline.
+INVENTORY_BACKEND = os.environ.get("INVENTORY_BACKEND", "memory")
+INVENTORY_PATH = os.environ.get("INVENTORY_PATH", "inventory.db" if INVENTORY_BACKEND == "sqlite" else "inventory_state")
+inventory = open_inventory(INVENTORY_BACKEND, INVENTORY_PATH)
 
 # --- MODELS ---
 class SensorReadings(BaseModel):
     vehicle_id: str
-    sensor_1: float
-    sensor_2: float
-    sensor_3: float
+    # NaN/inf would stay in the feature store's running sums for good: reject them here
+    sensor_1: float = Field(allow_inf_nan=False)
+    sensor_2: float = Field(allow_inf_nan=False)
+    sensor_3: float = Field(allow_inf_nan=False)
     timestamp: str
 
+class SensorBatch(BaseModel):
+    readings: List[SensorReadings]
+
 class InventoryUpdate(BaseModel):
     quantity: int
 
+class ModelLoadRequest(BaseModel):
+    name: str
+    version: str = "latest"
+    shadow: bool = False
+
 # --- LOGIC ---
-def call_supplier_api(part_id: str, quantity: int):
-    time.sleep(1) # Simulate network
-    print(f"⚡ [SUPPLIER] ORDER SENT: {quantity} x {part_id}")
+# Failure codes index into these tables: 0 = no part needed, 1 = vibration,
+# 2 = overheating, 3 = both (vibration + 2 * overheating).
+FAILURE_PARTS = [None, "PART_BRAKE_PAD", "PART_ENGINE_BELT", "PART_FILTER"]
+FAILURE_REASONS = [None, "Vibration", "Overheating", "Major Failure"]
+
+# --- MODEL ---
+# Per-vehicle rolling-window features feed the RUL model served by the model manager
+# (any object with predict(features) -> rul, see model.RULModel). Until a registry
+# version is loaded, the built-in trend model serves.
+MODEL_NAME = os.environ.get("MODEL_NAME")
+MODEL_VERSION = os.environ.get("MODEL_VERSION", "latest")
+MODEL_CACHE_DIR = os.environ.get("MODEL_CACHE_DIR", "model_cache")
+
+feature_store = FeatureStore(window=30, capacity=FLEET_CAPACITY)
+model_manager = ModelManager(TrendRULModel(), open_registry(), cache_dir=MODEL_CACHE_DIR)
+
+# Out-of-stock demand is coalesced into one order per part per flush window
+supplier_dispatcher = SupplierDispatcher(FakeSupplier(latency=1.0), flush_interval=1.0, max_concurrency=4)
+
+def batch_capacity() -> int:
+    """Most distinct vehicles one batch may hold: every per-vehicle store must fit them at once"""
+    return min(feature_store.slots.capacity, fleet_state.slots.capacity)
+
+def score_readings(vehicle_ids: List[str], sensors: np.ndarray):
+    """Vectorized prediction over rows of (sensor_1, sensor_2, sensor_3).
+
+    Returns (predicted_rul, maintenance_required, failure_code) arrays.
+    """
+    features = feature_store.update(vehicle_ids, sensors)
+    predicted_rul = np.rint(model_manager.predict(features)).astype(np.int64)
+    maintenance_required = predicted_rul < 30
+
+    # Thresholds: Temp > 400 OR Vib > 0.5 decide which part is needed
+    is_overheating = sensors[:, 2] > 400
+    is_vibrating = sensors[:, 1] > 0.5
+    failure_code = is_vibrating.astype(np.int8) + 2 * is_overheating.astype(np.int8)
+    failure_code[~maintenance_required] = 0
+    return predicted_rul, maintenance_required, failure_code
+
+async def reserve_parts(failure_code: np.ndarray):
+    """Resolve inventory for a whole batch with one atomic multi-part reservation.
+
+    Readings are served in order: the first `granted` readings needing a part
+    reserve it, the rest are back-ordered. Returns (reserved mask, shortfall per part).
+    """
+    reserved = np.zeros(len(failure_code), dtype=bool)
+    needed = {}
+    for code in range(1, len(FAILURE_PARTS)):
+        idx = np.flatnonzero(failure_code == code)
+        if idx.size:
+            needed[FAILURE_PARTS[code]] = idx
+    if not needed:
+        return reserved, {}
+
+    granted = await run_in_threadpool(inventory.reserve_many, {part: idx.size for part, idx in needed.items()})
+    shortfall = {}
+    for part, idx in needed.items():
+        n = granted.get(part, 0)
+        reserved[idx[:n]] = True
+        if idx.size > n:
+            shortfall[part] = int(idx.size - n)
+    return reserved, shortfall
+
+def action_message(maintenance: bool, code: int, reserved: Optional[bool]) -> str:
+    """Action for one reading; `reserved` is None while its part reservation is pending"""
+    if not maintenance:
+        return "No Action Needed"
+    if code == 0:
+        # Degrading trend with no sensor over its limit yet: nothing to reserve
+        return "⚠️ Degradation Trend: Inspection Scheduled"
+    if reserved is None:
+        return f"⏳ {FAILURE_REASONS[code]}: Reserving {FAILURE_PARTS[code]}"
+    if reserved:
+        return f"✅ {FAILURE_REASONS[code]}: Reserved {FAILURE_PARTS[code]}"
+    return f"🚨 {FAILURE_REASONS[code]}: {FAILURE_PARTS[code]} OUT OF STOCK. Ordered."
+
+async def process_readings(readings: List[SensorReadings]):
+    """Score a list of readings and apply inventory. Returns (results, shortfall per part)"""
+    n = len(readings)
+    vehicle_ids = [r.vehicle_id for r in readings]
+    sensors = np.array([(r.sensor_1, r.sensor_2, r.sensor_3) for r in readings], dtype=np.float64).reshape(n, 3)
+
+    # 1. Prediction Logic (Feature Store + RUL Model)
+    with STAGE_SECONDS.time("scoring"):
+        predicted_rul, maintenance_required, failure_code = score_readings(vehicle_ids, sensors)
+    maint_list, code_list = maintenance_required.tolist(), failure_code.tolist()
+    actions = [action_message(maint_list[i], code_list[i], None) for i in range(n)]
+
+    # 2. Save State for Dashboard, before the inventory step yields to other requests:
+    # fleet state must take a vehicle's readings in the order the feature store did
+    with STAGE_SECONDS.time("state_update"):
+        states = fleet_state.update_many(
+            vehicle_ids, [r.timestamp for r in readings], sensors,
+            predicted_rul, maintenance_required, actions,
+        )
+        broadcaster.touch(vehicle_ids)
+
+    # 3. Business Logic, then fill in the actions that waited on a reservation
+    with STAGE_SECONDS.time("inventory"):
+        reserved, shortfall = await reserve_parts(failure_code)
+    pending = np.flatnonzero(failure_code).tolist()
+    for i in pending:
+        actions[i] = states[i]["action"] = action_message(True, code_list[i], bool(reserved[i]))
+    if pending:
+        broadcaster.touch([vehicle_ids[i] for i in pending])
+
+    results = [
+        {"vehicle_id": vid, "predicted_rul": int(rul), "action_taken": action}
+        for vid, rul, action in zip(vehicle_ids, predicted_rul.tolist(), actions)
+    ]
+    return results, shortfall
+
+def order_shortfall(shortfall: dict):
+    """Hand out-of-stock demand to the supplier dispatcher"""
+    with STAGE_SECONDS.time("background"):
+        for part_needed, quantity in shortfall.items():
+            supplier_dispatcher.submit(part_needed, quantity)
+
+def observe_validation(request: Request):
+    """Charge the time between arrival and handler start (body read + validation)"""
+    t0 = getattr(request.state, "t0", None)
+    if t0 is not None:
+        STAGE_SECONDS.observe("validation", time.perf_counter() - t0)
+
+async def score_stream_batch(values: List[bytes]):
+    """Micro-batch handler for the stream consumer: same scoring and inventory path as /predict/batch"""
+    readings = []
+    with STAGE_SECONDS.time("validation"):
+        for raw in values:
+            try:
+                readings.append(SensorReadings(**json.loads(raw)))
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ [CONSUMER] Dropping malformed reading: {e}")
+    if not readings:
+        return []
+
+    results, shortfall = await process_readings(readings)
+    order_shortfall(shortfall)
+    return results
 
 @app.get("/")
-def health_check():
-    return {"status": "active", "inventory": inventory_db}
+def health_check(request: Request):
+    return json_etag_response(request, {"status": "active", "inventory": inventory.snapshot()})
 
+# Handlers reading loop-owned state (fleet state, feed, dispatcher) are `async def` so they
+# run on the event loop thread, never concurrently with the updates from process_readings
 @app.get("/live_stream")
-def get_live_stream():
-    """Endpoint for Dashboard to fetch the latest streamed data point"""
-    return latest_vehicle_state
+async def get_live_stream(request: Request, vehicle_id: Optional[str] = None, history: bool = False):
+    """Latest state of one vehicle, or of whichever vehicle reported last when no id is given"""
+    state = fleet_state.latest(vehicle_id)
+    if state is None:
+        if vehicle_id is not None:
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        state = WAITING_STATE
+    elif history:
+        state = {**state, "history": fleet_state.recent(state["vehicle_id"])}
+    return json_etag_response(request, state)
+
+@app.get("/stream/fleet")
+async def stream_fleet():
+    """Server-sent events: one snapshot, then a delta of changed vehicles and inventory per tick"""
+    return StreamingResponse(
+        broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/fleet/snapshot")
+async def get_fleet_snapshot(request: Request):
+    """Dashboard snapshot, serialized once per feed version; ETag is boot nonce + version"""
+    version, body = broadcaster.snapshot()
+    return etag_response(request, body, f'"{FEED_EPOCH}-v{version}"')
+
+@app.get("/fleet/at_risk")
+async def get_at_risk(n: int = Query(10, ge=1, le=1000)):
+    """The N vehicles with the lowest predicted RUL"""
+    return {"vehicles": fleet_state.lowest_rul(n)}
+
+@app.get("/fleet/maintenance")
+async def get_maintenance_queue(limit: int = Query(100, ge=1, le=10_000)):
+    """Vehicles whose latest prediction requires maintenance"""
+    return {"count": fleet_state.maintenance_count(), "vehicles": fleet_state.needing_maintenance(limit)}
+
+@app.get("/ingest/stats")
+def get_ingest_stats():
+    """Stream consumer counters (batches, records, commits)"""
+    if stream_consumer is None:
+        return {"enabled": False}
+    return {"enabled": True, "topic": SENSOR_TOPIC, **stream_consumer.stats}
+
+@app.get("/supplier/metrics")
+async def get_supplier_metrics():
+    """Supplier dispatcher queue depth, order counts and flush latency"""
+    return supplier_dispatcher.metrics()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition: latency histograms plus queue/fleet gauges"""
+    supplier = supplier_dispatcher.metrics()
+    lines = REQUEST_SECONDS.render() + STAGE_SECONDS.render() + SHADOW_SECONDS.render()
+    lines += render_gauges([
+        ("supplier_queue_depth", "Parts with pending supplier demand", supplier["queue_depth"]),
+        ("supplier_queued_units", "Units waiting for the next supplier flush", supplier["queued_units"]),
+        ("supplier_orders_sent", "Supplier orders sent", supplier["orders_sent"]),
+        ("supplier_flush_latency_avg_seconds", "Mean time from first demand to order sent", supplier["flush_latency_avg_s"]),
+        ("fleet_vehicles", "Vehicles tracked in the fleet state", len(fleet_state)),
+        ("fleet_maintenance", "Vehicles currently needing maintenance", fleet_state.maintenance_count()),
+        ("feed_subscribers", "Open /stream/fleet connections", broadcaster.subscriber_count),
+        ("ingest_records", "Records consumed from the sensor topic", stream_consumer.stats["records"] if stream_consumer else 0),
+    ])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.get("/model")
+def get_model_status():
+    """Served model, in-progress loads and shadow-mode latency/drift"""
+    return model_manager.status()
+
+@app.post("/model/load")
+def load_model(req: ModelLoadRequest):
+    """Load a registry version in the background; it is swapped in (or shadowed) once warm"""
+    try:
+        return model_manager.load(req.name, req.version, shadow=req.shadow)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.post("/model/promote")
+def promote_shadow_model():
+    """Serve the current shadow candidate"""
+    if not model_manager.promote_shadow():
+        raise HTTPException(status_code=404, detail="No shadow model")
+    return model_manager.status()
+
+@app.delete("/model/shadow")
+def clear_shadow_model():
+    model_manager.clear_shadow()
+    return model_manager.status()
 
 @app.post("/inventory/update")
 def update_inventory(part_name: str, update: InventoryUpdate):
-    if part_name not in inventory_db:
+    if part_name not in inventory:
         raise HTTPException(status_code=404, detail="Part not found")
-    inventory_db[part_name] = update.quantity
-    return {"message": "Updated", "inventory": inventory_db}
+    inventory.set(part_name, update.quantity)
+    return {"message": "Updated", "inventory": inventory.snapshot()}
 
 @app.post("/predict")
-async def predict_maintenance(data: SensorReadings, background_tasks: BackgroundTasks):
-    global latest_vehicle_state
-
-    # 1. Prediction Logic (Simulated Model)
-    # Thresholds: Temp > 400 OR Vib > 0.5
-    is_overheating = data.sensor_3 > 400
-    is_vibrating = data.sensor_2 > 0.5
-    
-    if is_overheating or is_vibrating:
-        predicted_rul = random.randint(5, 20) # Critical
-    else:
-        predicted_rul = random.randint(100, 200) # Healthy
+async def predict_maintenance(data: SensorReadings, request: Request):
+    observe_validation(request)
+    results, shortfall = await process_readings([data])
+    order_shortfall(shortfall)
 
-    maintenance_required = predicted_rul < 30
-    action_msg = "No Action Needed"
-
-    # 2. Business Logic
-    if maintenance_required:
-        if is_overheating and is_vibrating:
-            part_needed = "PART_FILTER"
-            reason = "Major Failure"
-        elif is_overheating:
-            part_needed = "PART_ENGINE_BELT"
-            reason = "Overheating"
-        else:
-            part_needed = "PART_BRAKE_PAD"
-            reason = "Vibration"
-            
-        # Inventory Check
-        stock = inventory_db.get(part_needed, 0)
-        if stock > 0:
-            inventory_db[part_needed] -= 1
-            action_msg = f"✅ {reason}: Reserved {part_needed}"
-        else:
-            background_tasks.add_task(call_supplier_api, part_needed, 1)
-            action_msg = f"🚨 {reason}: {part_needed} OUT OF STOCK. Ordered."
-
-    # 3. Save State for Dashboard
-    latest_vehicle_state = {
-        "vehicle_id": data.vehicle_id,
-        "timestamp": data.timestamp,
-        "sensors": {"temp": data.sensor_3, "vib": data.sensor_2},
-        "prediction": {"rul": predicted_rul, "maintenance": maintenance_required},
-        "action": action_msg
+    return {
+        **results[0],
+        "inventory_snapshot": inventory.snapshot()
     }
 
+@app.post("/predict/batch")
+async def predict_maintenance_batch(batch: SensorBatch, request: Request):
+    """Score a whole fleet tick in one request. Shortfall goes to the supplier dispatcher per part."""
+    observe_validation(request)
+    limit = batch_capacity()
+    if len({r.vehicle_id for r in batch.readings}) > limit:
+        raise HTTPException(status_code=413, detail=f"More than {limit} distinct vehicles in one batch")
+    results, shortfall = await process_readings(batch.readings)
+    order_shortfall(shortfall)
+
     return {
-        "vehicle_id": data.vehicle_id,
-        "predicted_rul": predicted_rul,
-        "action_taken": action_msg,
-        "inventory_snapshot": inventory_db.copy()
+        "results": results,
+        "inventory_snapshot": inventory.snapshot()
     }
 
 if __name__ == "__main__":
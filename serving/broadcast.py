@@ -0,0 +1,112 @@
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Iterable, Optional
+
+
+def sse_frame(event: str, version: int, data: dict) -> bytes:
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class Subscriber:
+    def __init__(self, backlog: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=backlog)
+        self.resync = False
+
+
+class Broadcaster:
+    """Server-sent events fan-out of fleet deltas.
+
+    Request handlers only `touch` the vehicles they changed. Every `interval` the
+    dirty set is turned into one delta by `build_delta`, serialized once, and the
+    same bytes are queued for every subscriber. A subscriber whose queue is full is
+    not waited for: its backlog is dropped and it gets a fresh snapshot instead, so
+    a slow dashboard never slows down the prediction path.
+    """
+
+    def __init__(self, build_delta: Callable[[set], Optional[dict]], build_snapshot: Callable[[], dict],
+                 interval: float = 0.5, backlog: int = 8, keepalive: float = 15.0):
+        self.build_delta = build_delta
+        self.build_snapshot = build_snapshot
+        self.interval = interval
+        self.backlog = backlog
+        self.keepalive = keepalive
+        self.version = 0
+        self._dirty: set = set()
+        self._subscribers: set = set()
+        self._snapshot_cache = (None, None)
+        self._task = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def touch(self, vehicle_ids: Iterable[str]):
+        self._dirty.update(vehicle_ids)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.publish()
+
+    def publish(self):
+        """Build, serialize and fan out one delta if anything changed since the last one"""
+        dirty, self._dirty = self._dirty, set()
+        delta = self.build_delta(dirty)
+        if delta is None:
+            return
+        self.version += 1
+        if not self._subscribers:
+            return
+        frame = sse_frame("delta", self.version, {"version": self.version, **delta})
+        for sub in self._subscribers:
+            if sub.resync:
+                continue
+            try:
+                sub.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                sub.resync = True
+
+    def snapshot(self):
+        """(version, serialized snapshot), built at most once per version"""
+        version, body = self._snapshot_cache
+        if version != self.version:
+            version = self.version
+            body = json.dumps({"version": version, **self.build_snapshot()}, separators=(",", ":")).encode()
+            self._snapshot_cache = (version, body)
+        return version, body
+
+    def _snapshot_frame(self) -> bytes:
+        version, body = self.snapshot()
+        return f"id: {version}\nevent: snapshot\ndata: ".encode() + body + b"\n\n"
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """SSE byte stream for one client: a snapshot, then deltas"""
+        sub = Subscriber(self.backlog)
+        self._subscribers.add(sub)
+        try:
+            yield self._snapshot_frame()
+            while True:
+                if sub.resync:
+                    while not sub.queue.empty():
+                        sub.queue.get_nowait()
+                    sub.resync = False
+                    yield self._snapshot_frame()
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+        finally:
+            self._subscribers.discard(sub)
@@ -0,0 +1,256 @@
+import asyncio
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+SENSOR_TOPIC = "fleet-sensors"
+
+Record = namedtuple("Record", ["topic", "partition", "offset", "value"])
+
+
+# --- SOURCES ---
+class KafkaSource:
+    """Thin wrapper over kafka-python's KafkaConsumer with manual offset commits"""
+
+    def __init__(self, topic: str, bootstrap_servers: str, group_id: str = "serving"):
+        from kafka import KafkaConsumer  # optional: only needed when a broker is configured
+
+        self._consumer = KafkaConsumer(
+            topic,
+            bootstrap_servers=bootstrap_servers,
+            group_id=group_id,
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+        )
+
+    def poll(self, max_records: int, timeout: float) -> List[Record]:
+        polled = self._consumer.poll(timeout_ms=int(timeout * 1000), max_records=max_records)
+        return [Record(m.topic, m.partition, m.offset, m.value) for msgs in polled.values() for m in msgs]
+
+    def commit(self, offsets: Dict[Tuple[str, int], int]):
+        from kafka import TopicPartition
+        from kafka.structs import OffsetAndMetadata
+
+        def meta(offset):
+            try:
+                return OffsetAndMetadata(offset, None, -1)  # kafka-python >= 2.1 adds leader_epoch
+            except TypeError:
+                return OffsetAndMetadata(offset, None)
+
+        self._consumer.commit({TopicPartition(t, p): meta(o) for (t, p), o in offsets.items()})
+
+    def close(self):
+        self._consumer.close()
+
+
+class InMemoryBroker:
+    """In-process Kafka stand-in for tests and local runs without Docker.
+
+    Topics are append-only lists per partition; records with the same key land on
+    the same partition, and committed offsets are tracked per consumer group.
+    """
+
+    def __init__(self, partitions: int = 1):
+        self.partitions = partitions
+        self._logs: Dict[str, List[List[bytes]]] = {}
+        self._committed: Dict[Tuple[str, str, int], int] = {}
+        self._cond = threading.Condition()
+
+    def produce(self, topic: str, value: bytes, key: bytes = None):
+        with self._cond:
+            logs = self._logs.setdefault(topic, [[] for _ in range(self.partitions)])
+            partition = zlib.crc32(key) % self.partitions if key is not None else 0
+            logs[partition].append(value)
+            self._cond.notify_all()
+
+    def committed(self, group_id: str, topic: str, partition: int = 0) -> int:
+        return self._committed.get((group_id, topic, partition), 0)
+
+    def consumer(self, topic: str, group_id: str = "serving") -> "InMemorySource":
+        return InMemorySource(self, topic, group_id)
+
+
+class InMemorySource:
+    def __init__(self, broker: InMemoryBroker, topic: str, group_id: str):
+        self.broker = broker
+        self.topic = topic
+        self.group_id = group_id
+        # Like Kafka, a new consumer resumes from the group's committed offsets
+        self._position = [broker.committed(group_id, topic, p) for p in range(broker.partitions)]
+
+    def _drain(self, max_records: int) -> List[Record]:
+        records = []
+        logs = self.broker._logs.get(self.topic, [])
+        for p, log in enumerate(logs):
+            while self._position[p] < len(log) and len(records) < max_records:
+                offset = self._position[p]
+                records.append(Record(self.topic, p, offset, log[offset]))
+                self._position[p] += 1
+        return records
+
+    def poll(self, max_records: int, timeout: float) -> List[Record]:
+        deadline = time.monotonic() + timeout
+        with self.broker._cond:
+            while True:
+                records = self._drain(max_records)
+                remaining = deadline - time.monotonic()
+                if records or remaining <= 0:
+                    return records
+                self.broker._cond.wait(remaining)
+
+    def commit(self, offsets: Dict[Tuple[str, int], int]):
+        with self.broker._cond:
+            for (topic, partition), offset in offsets.items():
+                self.broker._committed[(self.group_id, topic, partition)] = offset
+
+    def close(self):
+        pass
+
+
+# --- MICRO-BATCHING ---
+class MicroBatchConsumer:
+    """Reads a sensor topic, forms micro-batches by size or time and commits after processing.
+
+    A poller task fills a queue of at most `max_pending` batches; when processing
+    falls behind the poller stops fetching, so bursts wait in the broker instead of
+    in memory. Offsets are committed only once the batch holding them has been
+    handled (at-least-once delivery). Malformed records are the handler's to drop,
+    so a batch that raises is treated as a transient failure and retried with
+    exponential backoff; nothing behind it is committed until it succeeds. Poll
+    and commit errors (broker outage, rebalance) are logged and retried the same
+    way. `stats["state"]` shows whether the consumer is running or backing off.
+    """
+
+    def __init__(self, source, handle_batch: Callable[[List[bytes]], object],
+                 max_batch: int = 500, max_wait: float = 0.05, max_pending: int = 4,
+                 retry_backoff: float = 0.1, max_backoff: float = 5.0):
+        self.source = source
+        self.handle_batch = handle_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.stats = {"state": "idle", "batches": 0, "records": 0, "commits": 0,
+                      "batch_retries": 0, "source_errors": 0, "last_error": None}
+        self._queue: asyncio.Queue = None
+        self._to_commit: Dict[Tuple[str, int], int] = {}
+        self._running = False
+        # Broker clients are not thread-safe: every source call goes through one dedicated thread
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-consumer")
+
+    async def _call(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, fn, *args)
+
+    def _error(self, state: str, message: str):
+        print(f"❌ [CONSUMER] {message}")
+        self.stats["state"] = state
+        self.stats["last_error"] = message
+
+    async def run(self):
+        self._running = True
+        self.stats["state"] = "running"
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        processor = asyncio.create_task(self._process_loop())
+        delay = self.retry_backoff
+        try:
+            while self._running:
+                try:
+                    await self._commit()
+                    batch = await self._next_batch()
+                except Exception as e:
+                    self.stats["source_errors"] += 1
+                    self._error("source_backoff", f"Broker error, retrying in {delay:.1f}s: {e!r}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+                    continue
+                if delay != self.retry_backoff:
+                    delay = self.retry_backoff
+                    self.stats["state"] = "running"
+                if batch:
+                    await self._queue.put(batch)
+        finally:
+            await self._queue.put(None)
+            await processor
+            try:
+                await self._commit()
+            except Exception as e:
+                self._error("stopped", f"Final commit failed, uncommitted records will be redelivered: {e!r}")
+            await self._call(self.source.close)
+            self._io.shutdown(wait=False)
+            self.stats["state"] = "stopped"
+
+    def stop(self):
+        self._running = False
+
+    async def _next_batch(self) -> List[Record]:
+        loop = asyncio.get_running_loop()
+        records: List[Record] = []
+        deadline = None
+        while self._running and len(records) < self.max_batch:
+            timeout = self.max_wait if deadline is None else deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                polled = await self._call(self.source.poll, self.max_batch - len(records), timeout)
+            except Exception:
+                if records:
+                    break  # hand over what was already fetched; the error resurfaces on the next poll
+                raise
+            if not polled and deadline is None:
+                break  # idle: hand back so pending offsets get committed
+            if deadline is None:
+                # The time window opens with the first record of the batch
+                deadline = loop.time() + self.max_wait
+            records.extend(polled)
+        return records
+
+    async def _process_loop(self):
+        abandoned = False
+        while True:
+            batch = await self._queue.get()
+            if batch is None:
+                return
+            if abandoned:
+                continue  # stopping behind an unhandled batch: everything after it is redelivered
+            if not await self._handle(batch):
+                abandoned = True
+                continue
+            self.stats["batches"] += 1
+            self.stats["records"] += len(batch)
+            for r in batch:
+                key = (r.topic, r.partition)
+                self._to_commit[key] = max(self._to_commit.get(key, 0), r.offset + 1)
+
+    async def _handle(self, batch: List[Record]) -> bool:
+        """Run the handler until it succeeds; False if the consumer is stopped first"""
+        delay = self.retry_backoff
+        while True:
+            try:
+                result = self.handle_batch([r.value for r in batch])
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                if not self._running:
+                    self._error("stopped", f"Batch of {len(batch)} failed during shutdown, left uncommitted: {e!r}")
+                    return False
+                self.stats["batch_retries"] += 1
+                self._error("batch_backoff", f"Batch of {len(batch)} failed, retrying in {delay:.1f}s: {e!r}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            if delay != self.retry_backoff:
+                self.stats["state"] = "running"
+            return True
+
+    async def _commit(self):
+        if not self._to_commit:
+            return
+        offsets, self._to_commit = self._to_commit, {}
+        # Not re-sent on failure: later commits carry newer offsets of the same partitions, and
+        # re-sending these after a rebalance could rewind the new owner. Worst case is redelivery.
+        await self._call(self.source.commit, offsets)
+        self.stats["commits"] += 1
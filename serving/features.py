@@ -0,0 +1,122 @@
+import numpy as np
+from typing import Sequence
+
+from slots import SlotAllocator, occurrence_rank
+
+# --- FEATURE LAYOUT ---
+CHANNELS = ["sensor_1", "sensor_2", "sensor_3"]
+FEATURE_KINDS = ["last", "mean", "slope", "ewma", "delta"]
+FEATURE_NAMES = [f"{ch}_{kind}" for ch in CHANNELS for kind in FEATURE_KINDS]
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+
+class FeatureStore:
+    """Rolling-window features per vehicle, updated in O(1) per reading.
+
+    Every vehicle owns one slot in preallocated arrays: a float32 ring buffer of the
+    last `window` readings plus running sums, so memory is fixed by `capacity` and
+    idle vehicles are evicted least-recently-used first.
+
+    For each channel we keep sum(y) and sum(k * y), where k is the position inside
+    the window (0 = oldest). When the window slides every k drops by one, which
+    turns into sum(k * y) -= sum(y of survivors), so the least-squares slope never
+    needs a pass over the buffer.
+    """
+
+    def __init__(self, window: int = 30, capacity: int = 20_000, alpha: float = 0.2):
+        if window < 2:
+            raise ValueError("window must hold at least 2 readings")
+        self.window = window
+        self.alpha = alpha
+        self.slots = SlotAllocator(capacity)
+
+        c = len(CHANNELS)
+        self._buf = np.zeros((capacity, window, c), dtype=np.float32)
+        self._head = np.zeros(capacity, dtype=np.int32)    # next write position
+        self._count = np.zeros(capacity, dtype=np.int32)   # readings in window (<= window)
+        self._sum = np.zeros((capacity, c))
+        self._sum_ky = np.zeros((capacity, c))
+        self._ewma = np.zeros((capacity, c))
+        self._last = np.zeros((capacity, c))
+        self._prev = np.zeros((capacity, c))
+
+    def __len__(self):
+        return len(self.slots)
+
+    def update(self, vehicle_ids: Sequence[str], values) -> np.ndarray:
+        """Push one reading per id (rows of `values`, columns = CHANNELS).
+
+        Returns the feature matrix (columns = FEATURE_NAMES) as of each reading.
+        A vehicle may appear several times; its readings are applied in order.
+        """
+        n = len(vehicle_ids)
+        # Round to the buffer dtype so the value added to the sums is exactly the one removed later
+        values = np.asarray(values, dtype=np.float32).reshape(n, len(CHANNELS)).astype(np.float64)
+        slots, fresh, _ = self.slots.acquire(vehicle_ids)
+        slots = np.asarray(slots, dtype=np.intp)
+        if fresh:
+            self._reset(np.asarray(fresh, dtype=np.intp))
+
+        features = np.empty((n, len(FEATURE_NAMES)))
+        rank = occurrence_rank(slots)
+        if rank is None:
+            self._push(slots, values)
+            features[:] = self._features(slots)
+        else:
+            for r in range(int(rank.max()) + 1):
+                sel = np.flatnonzero(rank == r)
+                self._push(slots[sel], values[sel])
+                features[sel] = self._features(slots[sel])
+        return features
+
+    def get(self, vehicle_id: str):
+        """Current features of one vehicle, or None if it is not tracked"""
+        slot = self.slots.get(vehicle_id)
+        if slot is None:
+            return None
+        return self._features(np.array([slot]))[0]
+
+    # --- INTERNALS ---
+    def _reset(self, slots: np.ndarray):
+        self._head[slots] = 0
+        self._count[slots] = 0
+        self._sum[slots] = 0
+        self._sum_ky[slots] = 0
+
+    def _push(self, slots: np.ndarray, y: np.ndarray):
+        w = self.window
+        n = self._count[slots]
+        head = self._head[slots]
+        full = (n == w)[:, None]
+        first = (n == 0)[:, None]
+
+        y_old = np.where(full, self._buf[slots, head], 0.0)
+        total = self._sum[slots]
+        # Full window: drop the oldest (k = 0), shift survivors one step older, append at k = w - 1
+        self._sum_ky[slots] = np.where(
+            full,
+            self._sum_ky[slots] - (total - y_old) + (w - 1) * y,
+            self._sum_ky[slots] + n[:, None] * y,
+        )
+        self._sum[slots] = total - y_old + y
+
+        self._buf[slots, head] = y
+        self._head[slots] = (head + 1) % w
+        self._count[slots] = np.minimum(n + 1, w)
+
+        last = self._last[slots]
+        self._prev[slots] = np.where(first, y, last)
+        self._last[slots] = y
+        self._ewma[slots] = np.where(first, y, self.alpha * y + (1 - self.alpha) * self._ewma[slots])
+
+    def _features(self, slots: np.ndarray) -> np.ndarray:
+        cnt = self._count[slots].astype(np.float64)[:, None]
+        total = self._sum[slots]
+        mean = total / cnt
+        # Least-squares slope over k = 0..cnt-1: sum((k - k_mean) * y) / sum((k - k_mean)^2)
+        denom = cnt * (cnt * cnt - 1) / 12
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slope = np.where(cnt > 1, (self._sum_ky[slots] - (cnt - 1) / 2 * total) / denom, 0.0)
+        last = self._last[slots]
+        out = np.stack([last, mean, slope, self._ewma[slots], last - self._prev[slots]], axis=2)
+        return out.reshape(len(slots), len(FEATURE_NAMES))
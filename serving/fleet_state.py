@@ -0,0 +1,158 @@
+import bisect
+import itertools
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from slots import SlotAllocator, occurrence_rank
+
+HISTORY_FIELDS = ["sensor_1", "sensor_2", "sensor_3", "rul"]
+
+
+class FleetState:
+    """Live state of every vehicle: latest prediction and action plus a bounded history.
+
+    History is a float32 ring buffer of the last `history` (sensors, RUL) rows per
+    vehicle in preallocated slot arrays, so memory is fixed by `capacity`; idle
+    vehicles are evicted least-recently-used first. Two indexes are maintained on
+    every update so fleet queries never scan all vehicles:
+    RUL buckets (integer RUL -> ids, with sorted bucket keys) and the set of
+    vehicles needing maintenance. Not thread-safe: update and query it from the
+    event loop thread only.
+    """
+
+    def __init__(self, capacity: int = 20_000, history: int = 60):
+        self.history = history
+        self.slots = SlotAllocator(capacity)
+        self._hist = np.zeros((capacity, history, len(HISTORY_FIELDS)), dtype=np.float32)
+        self._head = np.zeros(capacity, dtype=np.int32)
+        self._count = np.zeros(capacity, dtype=np.int32)
+        self._latest: List[Optional[dict]] = [None] * capacity
+
+        self._bucket_of: Dict[str, int] = {}
+        self._buckets: Dict[int, set] = {}
+        self._bucket_keys: List[int] = []
+        self._maintenance: set = set()
+        self.last_vehicle_id: Optional[str] = None
+
+    def __len__(self):
+        return len(self.slots)
+
+    def update_many(self, vehicle_ids: Sequence[str], timestamps: Sequence[str], sensors: np.ndarray,
+                    rul: np.ndarray, maintenance: np.ndarray, actions: Sequence[str]) -> List[dict]:
+        """Record one scored reading per row (sensors columns = sensor_1..3), in order.
+
+        Returns the state dict of each row; a caller may still fill in its "action".
+        """
+        n = len(vehicle_ids)
+        if n == 0:
+            return []
+        slots, fresh, evicted = self.slots.acquire(vehicle_ids)
+        for vid in evicted:
+            self._unindex(vid)
+        slots = np.asarray(slots, dtype=np.intp)
+        if fresh:
+            fresh = np.asarray(fresh, dtype=np.intp)
+            self._head[fresh] = 0
+            self._count[fresh] = 0
+
+        rows = np.empty((n, len(HISTORY_FIELDS)), dtype=np.float32)
+        rows[:, :3] = sensors
+        rows[:, 3] = rul
+        rank = occurrence_rank(slots)
+        if rank is None:
+            self._push(slots, rows)
+        else:
+            for r in range(int(rank.max()) + 1):
+                sel = np.flatnonzero(rank == r)
+                self._push(slots[sel], rows[sel])
+
+        # Latest state and indexes: later readings of the same vehicle overwrite earlier ones
+        rul_list = rul.tolist()
+        maint_list = maintenance.tolist()
+        sensor_list = sensors.tolist()
+        states = []
+        for i, vid in enumerate(vehicle_ids):
+            state = self._latest[slots[i]] = {
+                "vehicle_id": vid,
+                "timestamp": timestamps[i],
+                "sensors": {"temp": sensor_list[i][2], "vib": sensor_list[i][1]},
+                "prediction": {"rul": rul_list[i], "maintenance": maint_list[i]},
+                "action": actions[i],
+            }
+            states.append(state)
+            self._index(vid, int(rul_list[i]), maint_list[i])
+        self.last_vehicle_id = vehicle_ids[-1]
+        return states
+
+    # --- QUERIES ---
+    def latest(self, vehicle_id: Optional[str] = None) -> Optional[dict]:
+        """Latest state of `vehicle_id`, or of whichever vehicle reported last"""
+        if vehicle_id is None:
+            vehicle_id = self.last_vehicle_id
+        slot = self.slots.get(vehicle_id) if vehicle_id is not None else None
+        return self._latest[slot] if slot is not None else None
+
+    def recent(self, vehicle_id: str) -> Optional[Dict[str, list]]:
+        """Buffered history of one vehicle, oldest first, one list per HISTORY_FIELDS entry"""
+        slot = self.slots.get(vehicle_id)
+        if slot is None:
+            return None
+        cnt, head = int(self._count[slot]), int(self._head[slot])
+        order = (np.arange(head - cnt, head)) % self.history
+        data = self._hist[slot, order]
+        return {name: data[:, i].tolist() for i, name in enumerate(HISTORY_FIELDS)}
+
+    def lowest_rul(self, n: int = 10) -> List[dict]:
+        """The `n` vehicles with the lowest current RUL, lowest first"""
+        out = []
+        for key in self._bucket_keys:
+            if len(out) >= n:
+                break
+            # Ties within a bucket have equal RUL, so any members will do
+            out.extend(self.latest(vid) for vid in itertools.islice(self._buckets[key], n - len(out)))
+        return out
+
+    def needing_maintenance(self, limit: int = 100) -> List[dict]:
+        return [self.latest(vid) for vid in itertools.islice(self._maintenance, limit)]
+
+    def maintenance_count(self) -> int:
+        return len(self._maintenance)
+
+    # --- INTERNALS ---
+    def _push(self, slots: np.ndarray, rows: np.ndarray):
+        head = self._head[slots]
+        self._hist[slots, head] = rows
+        self._head[slots] = (head + 1) % self.history
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.history)
+
+    def _index(self, vehicle_id: str, bucket: int, maintenance: bool):
+        old = self._bucket_of.get(vehicle_id)
+        if old != bucket:
+            if old is not None:
+                self._drop_from_bucket(vehicle_id, old)
+            members = self._buckets.get(bucket)
+            if members is None:
+                members = self._buckets[bucket] = set()
+                bisect.insort(self._bucket_keys, bucket)
+            members.add(vehicle_id)
+            self._bucket_of[vehicle_id] = bucket
+        if maintenance:
+            self._maintenance.add(vehicle_id)
+        else:
+            self._maintenance.discard(vehicle_id)
+
+    def _unindex(self, vehicle_id: str):
+        old = self._bucket_of.pop(vehicle_id, None)
+        if old is not None:
+            self._drop_from_bucket(vehicle_id, old)
+        self._maintenance.discard(vehicle_id)
+        if self.last_vehicle_id == vehicle_id:
+            self.last_vehicle_id = None
+
+    def _drop_from_bucket(self, vehicle_id: str, bucket: int):
+        members = self._buckets[bucket]
+        members.discard(vehicle_id)
+        if not members:
+            del self._buckets[bucket]
+            self._bucket_keys.pop(bisect.bisect_left(self._bucket_keys, bucket))
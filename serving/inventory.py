@@ -0,0 +1,278 @@
+import json
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+DEFAULT_STOCK = {
+    "PART_BRAKE_PAD": 5,
+    "PART_ENGINE_BELT": 10,
+    "PART_FILTER": 20
+}
+
+
+class InventoryStore(ABC):
+    """Stock levels with atomic check-and-reserve.
+
+    `reserve_many` takes the demand of a whole batch ({part: units}) and grants, per
+    part, as many units as are in stock, in one atomic step. Unknown parts are
+    never granted and never created; only `set` changes the catalogue's stock.
+    """
+
+    @abstractmethod
+    def snapshot(self) -> Dict[str, int]:
+        ...
+
+    @abstractmethod
+    def __contains__(self, part_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def set(self, part_id: str, quantity: int):
+        ...
+
+    @abstractmethod
+    def reserve_many(self, demand: Dict[str, int]) -> Dict[str, int]:
+        ...
+
+    def reserve(self, part_id: str, quantity: int = 1) -> bool:
+        """All-or-nothing reservation of a single part"""
+        if self.get(part_id) is None:
+            return False
+        return self.reserve_many({part_id: quantity}).get(part_id, 0) == quantity
+
+    def get(self, part_id: str) -> Optional[int]:
+        return self.snapshot().get(part_id)
+
+    def close(self):
+        pass
+
+
+class MemoryInventory(InventoryStore):
+    """In-process store with per-part locks, an append-only log and periodic snapshots.
+
+    Every change is appended to `<directory>/inventory.log` with a sequence number
+    before it is visible. After `snapshot_every` entries the full state and the last
+    sequence number are written to `<directory>/inventory.snapshot.json` and the log
+    starts over, so recovery is "load snapshot, replay log entries after it". A crash
+    between writing the snapshot and truncating the log therefore applies nothing
+    twice. Suitable for a single worker process; use SQLiteInventory to share stock
+    between workers.
+    """
+
+    def __init__(self, directory: Optional[str] = None, initial: Dict[str, int] = None,
+                 snapshot_every: int = 10_000, fsync: bool = False):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self._stock: Dict[str, int] = dict(initial or {})
+        self._locks: Dict[str, threading.Lock] = {}
+        self._catalogue_lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._log = None
+        self._log_entries = 0
+        self._seq = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._recover()
+            self._log = open(self._log_path, "a", encoding="utf-8")
+        self._locks = {part: threading.Lock() for part in self._stock}
+
+    @property
+    def _log_path(self):
+        return os.path.join(self.directory, "inventory.log")
+
+    @property
+    def _snapshot_path(self):
+        return os.path.join(self.directory, "inventory.snapshot.json")
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self._stock)
+
+    def __contains__(self, part_id: str) -> bool:
+        return part_id in self._stock
+
+    def get(self, part_id: str) -> Optional[int]:
+        return self._stock.get(part_id)
+
+    def set(self, part_id: str, quantity: int):
+        with self._catalogue_lock:
+            lock = self._locks.setdefault(part_id, threading.Lock())
+        with lock:
+            self._append({"op": "set", "part": part_id, "qty": quantity})
+            self._stock[part_id] = quantity
+        self._maybe_snapshot()
+
+    def reserve_many(self, demand: Dict[str, int]) -> Dict[str, int]:
+        parts = sorted(p for p, n in demand.items() if n > 0 and p in self._locks)
+        # Fixed lock order: concurrent multi-part reservations cannot deadlock
+        locks = [self._locks[p] for p in parts]
+        for lock in locks:
+            lock.acquire()
+        try:
+            granted = {p: min(max(self._stock[p], 0), demand[p]) for p in parts}
+            granted = {p: n for p, n in granted.items() if n}
+            if granted:
+                self._append({"op": "reserve", "parts": granted})
+                for p, n in granted.items():
+                    self._stock[p] -= n
+        finally:
+            for lock in locks:
+                lock.release()
+        if granted:
+            self._maybe_snapshot()
+        return granted
+
+    def close(self):
+        if self._log is not None:
+            with self._log_lock:
+                self._log.close()
+                self._log = None
+
+    # --- PERSISTENCE ---
+    def _append(self, entry: dict):
+        if self._log is None:
+            return
+        with self._log_lock:
+            self._seq += 1
+            entry["seq"] = self._seq
+            self._log.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._log.flush()
+            if self.fsync:
+                os.fsync(self._log.fileno())
+            self._log_entries += 1
+
+    def _maybe_snapshot(self):
+        if self._log is not None and self._log_entries >= self.snapshot_every:
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        """Persist the full state and truncate the log (blocks all writers briefly)"""
+        if self._log is None:
+            return
+        locks = [self._locks[p] for p in sorted(self._locks)]
+        for lock in locks:
+            lock.acquire()
+        try:
+            with self._log_lock:
+                tmp = self._snapshot_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump({"seq": self._seq, "stock": self._stock}, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self._snapshot_path)
+                self._log.close()
+                self._log = open(self._log_path, "w", encoding="utf-8")
+                self._log_entries = 0
+        finally:
+            for lock in locks:
+                lock.release()
+
+    def _recover(self):
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self._stock = {p: int(q) for p, q in saved["stock"].items()}
+            self._seq = saved["seq"]
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, "rb+") as f:
+            good = 0
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete entry")
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn final write from a crash: drop it so new entries follow intact ones
+                    f.truncate(good)
+                    break
+                good += len(line)
+                if entry["seq"] <= self._seq:
+                    continue  # already in the snapshot: the crash came before the log was truncated
+                self._seq = entry["seq"]
+                if entry["op"] == "set":
+                    self._stock[entry["part"]] = entry["qty"]
+                else:
+                    for p, n in entry["parts"].items():
+                        self._stock[p] = self._stock.get(p, 0) - n
+                self._log_entries += 1
+
+
+class SQLiteInventory(InventoryStore):
+    """Stock in a SQLite database in WAL mode, shared by every worker process.
+
+    WAL is SQLite's own append-only log and checkpoints are its snapshots.
+    `reserve_many` runs in one BEGIN IMMEDIATE transaction, so concurrent workers
+    see a single consistent stock level. synchronous=NORMAL keeps commits off
+    fsync (durable across process crashes, not power loss).
+    """
+
+    def __init__(self, path: str, initial: Dict[str, int] = None):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS stock (part TEXT PRIMARY KEY, qty INTEGER NOT NULL)")
+        conn.executemany("INSERT OR IGNORE INTO stock (part, qty) VALUES (?, ?)", (initial or {}).items())
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def snapshot(self) -> Dict[str, int]:
+        return dict(self._conn().execute("SELECT part, qty FROM stock ORDER BY rowid"))
+
+    def __contains__(self, part_id: str) -> bool:
+        return self.get(part_id) is not None
+
+    def get(self, part_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT qty FROM stock WHERE part = ?", (part_id,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, part_id: str, quantity: int):
+        self._conn().execute(
+            "INSERT INTO stock (part, qty) VALUES (?, ?) ON CONFLICT(part) DO UPDATE SET qty = excluded.qty",
+            (part_id, quantity))
+
+    def reserve_many(self, demand: Dict[str, int]) -> Dict[str, int]:
+        demand = {p: n for p, n in demand.items() if n > 0}
+        if not demand:
+            return {}
+        conn = self._conn()
+        granted = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for part, wanted in sorted(demand.items()):
+                row = conn.execute("SELECT qty FROM stock WHERE part = ?", (part,)).fetchone()
+                n = min(max(row[0], 0), wanted) if row else 0
+                if n:
+                    conn.execute("UPDATE stock SET qty = qty - ? WHERE part = ?", (n, part))
+                    granted[part] = n
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return granted
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_inventory(backend: str = "memory", path: Optional[str] = None,
+                   initial: Dict[str, int] = None) -> InventoryStore:
+    """Build the configured store. `path` is a directory for "memory", a database file for "sqlite"."""
+    initial = DEFAULT_STOCK if initial is None else initial
+    if backend == "memory":
+        return MemoryInventory(path, initial)
+    if backend == "sqlite":
+        return SQLiteInventory(path or "inventory.db", initial)
+    raise ValueError(f"Unknown inventory backend: {backend}")
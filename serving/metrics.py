@@ -0,0 +1,96 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Seconds; fine-grained at the low end where per-stage timings live
+DEFAULT_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram rendered in Prometheus text format"""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series: Dict[str, List] = {}
+
+    def observe(self, label_value: str, seconds: float):
+        series = self._series.get(label_value)
+        if series is None:
+            # [per-bucket counts (+Inf last), sum, count]
+            series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+        series[2] += 1
+
+    @contextmanager
+    def time(self, label_value: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(label_value, time.perf_counter() - t0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for value, (counts, total, count) in sorted(self._series.items()):
+            label = f'{self.label}="{value}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total}")
+            lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+
+def render_gauges(gauges: List[Tuple[str, str, float]]) -> List[str]:
+    """Prometheus text for (name, help, value) gauges"""
+    lines = []
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return lines
+
+
+# --- HOT-PATH METRICS ---
+REQUEST_SECONDS = Histogram("request_duration_seconds", "End-to-end HTTP request latency", "path")
+STAGE_SECONDS = Histogram(
+    "request_stage_seconds",
+    "Time spent per request-path stage (validation, scoring, inventory, state_update, background)",
+    "stage")
+
+
+class TimingMiddleware:
+    """Pure ASGI middleware timing every HTTP request by route path.
+
+    Stores the arrival time in the request state as `t0`, so handlers can charge
+    the time spent before they run (body read + validation) to the validation stage.
+    Streaming endpoints under `skip_prefix` are not timed (their duration is the
+    connection lifetime).
+    """
+
+    def __init__(self, app, skip_prefix: str = "/stream"):
+        self.app = app
+        self.skip_prefix = skip_prefix
+        self._paths = None
+
+    def _label(self, scope) -> str:
+        if self._paths is None:
+            self._paths = {getattr(r, "path", None) for r in scope["app"].routes}
+        path = scope["path"]
+        return path if path in self._paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefix):
+            return await self.app(scope, receive, send)
+        t0 = time.perf_counter()
+        scope.setdefault("state", {})["t0"] = t0
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            REQUEST_SECONDS.observe(self._label(scope), time.perf_counter() - t0)
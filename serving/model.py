@@ -0,0 +1,54 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from features import FEATURE_INDEX
+
+
+class RULModel(ABC):
+    """Interface for Remaining Useful Life models.
+
+    `predict` takes the feature matrix built by `FeatureStore.update` (one row per
+    reading, columns = features.FEATURE_NAMES) and returns predicted remaining
+    cycles, one per row. The model manager only calls `predict`, so any object with
+    that method can be served; subclasses get the check that it is implemented.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        ...
+
+
+class TrendRULModel(RULModel):
+    """Baseline degradation model: cycles until the smoothed sensor crosses its alarm limit.
+
+    For every monitored sensor the EWMA is extrapolated along the window slope to
+    the limit. A reading already over the limit caps RUL at `critical_rul`.
+    """
+
+    name = "trend-baseline"
+
+    # Same alarm limits the business rules use: Temp > 400 OR Vib > 0.5
+    DEFAULT_LIMITS = {"sensor_3": 400.0, "sensor_2": 0.5}
+
+    def __init__(self, limits=None, max_rul: float = 200.0, critical_rul: float = 20.0):
+        self.limits = dict(limits or self.DEFAULT_LIMITS)
+        self.max_rul = max_rul
+        self.critical_rul = critical_rul
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        rul = np.full(len(features), self.max_rul)
+        for channel, limit in self.limits.items():
+            last = features[:, FEATURE_INDEX[f"{channel}_last"]]
+            ewma = features[:, FEATURE_INDEX[f"{channel}_ewma"]]
+            slope = features[:, FEATURE_INDEX[f"{channel}_slope"]]
+
+            headroom = limit - ewma
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cycles = np.where(slope > 0, headroom / slope, np.inf)
+            cycles = np.where(headroom <= 0, 0.0, cycles)
+            cycles = np.where(last > limit, np.minimum(cycles, self.critical_rul), cycles)
+            rul = np.minimum(rul, cycles)
+        return np.clip(rul, 0.0, self.max_rul)
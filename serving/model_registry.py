@@ -0,0 +1,252 @@
+import os
+import pickle
+import queue
+import re
+import shutil
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from features import FEATURE_NAMES
+from metrics import Histogram
+from model import RULModel
+
+SHADOW_SECONDS = Histogram("shadow_predict_seconds", "Candidate model latency in shadow mode", "model")
+
+# Names and versions become registry and cache paths: no separators, no "..", no quotes
+MODEL_NAME_PATTERN = re.compile(r"[\w.-]+", re.ASCII)
+MODEL_VERSION_PATTERN = re.compile(r"\d+|latest", re.ASCII)
+
+
+def validate_model_ref(name: str, version: str):
+    """Raise ValueError unless `name` is a plain model name and `version` is digits or 'latest'"""
+    if not MODEL_NAME_PATTERN.fullmatch(name) or not name.strip("."):
+        raise ValueError(f"Invalid model name {name!r}: use letters, digits, '_', '-' and '.'")
+    if not MODEL_VERSION_PATTERN.fullmatch(version):
+        raise ValueError(f"Invalid model version {version!r}: use a version number or 'latest'")
+
+
+# --- REGISTRIES ---
+class LocalRegistry:
+    """File-based registry for offline use: `<root>/<name>/<version>/` holds the artifact files"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def resolve(self, name: str, version: str = "latest") -> str:
+        if version != "latest":
+            return str(version)
+        versions = [v for v in os.listdir(os.path.join(self.root, name)) if v.isdigit()]
+        if not versions:
+            raise LookupError(f"No versions of model '{name}' in {self.root}")
+        return max(versions, key=int)
+
+    def fetch(self, name: str, version: str, dst: str):
+        shutil.copytree(os.path.join(self.root, name, version), dst)
+
+
+class MlflowRegistry:
+    """MLflow Model Registry (the `mlflow` service in docker-compose.yml)"""
+
+    def __init__(self, tracking_uri: str):
+        import mlflow  # optional: only needed when a tracking server is configured
+
+        self._mlflow = mlflow
+        self.tracking_uri = tracking_uri
+        mlflow.set_tracking_uri(tracking_uri)
+
+    def resolve(self, name: str, version: str = "latest") -> str:
+        if version != "latest":
+            return str(version)
+        client = self._mlflow.tracking.MlflowClient()
+        versions = [int(mv.version) for mv in client.search_model_versions(f"name='{name}'")]
+        if not versions:
+            raise LookupError(f"No versions of model '{name}' in {self.tracking_uri}")
+        return str(max(versions))
+
+    def fetch(self, name: str, version: str, dst: str):
+        os.makedirs(dst)
+        self._mlflow.artifacts.download_artifacts(artifact_uri=f"models:/{name}/{version}", dst_path=dst)
+
+
+def open_registry() -> Optional[object]:
+    """MLFLOW_TRACKING_URI selects MLflow; otherwise MODEL_REGISTRY_DIR selects the local store"""
+    if os.environ.get("MLFLOW_TRACKING_URI"):
+        return MlflowRegistry(os.environ["MLFLOW_TRACKING_URI"])
+    if os.environ.get("MODEL_REGISTRY_DIR"):
+        return LocalRegistry(os.environ["MODEL_REGISTRY_DIR"])
+    return None
+
+
+# --- ARTIFACTS ---
+class PyfuncRULModel(RULModel):
+    """Adapts an MLflow pyfunc model (expects a DataFrame with FEATURE_NAMES columns)"""
+
+    def __init__(self, pyfunc_model, name: str):
+        self._model = pyfunc_model
+        self.name = name
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        import pandas as pd
+
+        out = self._model.predict(pd.DataFrame(features, columns=FEATURE_NAMES))
+        return np.asarray(out, dtype=np.float64).reshape(len(features))
+
+
+def load_artifact(path: str, name: str) -> RULModel:
+    """Load a cached artifact: a pickled RULModel (`model.pkl`, trusted sources only) or an MLflow model"""
+    found = os.path.join(path, "model.pkl")
+    if os.path.exists(found):
+        with open(found, "rb") as f:
+            return pickle.load(f)
+    for root, _, files in os.walk(path):
+        if "MLmodel" in files:
+            import mlflow.pyfunc
+
+            return PyfuncRULModel(mlflow.pyfunc.load_model(root), name)
+    raise FileNotFoundError(f"No model.pkl or MLmodel under {path}")
+
+
+# --- MANAGER ---
+class ModelManager:
+    """Serves the active RUL model and swaps in new versions without pausing requests.
+
+    `load` fetches a registry version into the local artifact cache (skipped if
+    already cached), loads it and runs a warm-up prediction on a background
+    thread. Only then is the model published, with a single reference
+    assignment, so requests keep using the previous model until the new one is
+    ready. With `shadow=True` the model becomes a candidate instead: it scores a
+    copy of live traffic off the request path, and latency and drift against the
+    served predictions are recorded without affecting the result.
+    """
+
+    def __init__(self, default: RULModel, registry=None, cache_dir: str = "model_cache",
+                 shadow_queue: int = 256):
+        self.registry = registry
+        self.cache_dir = cache_dir
+        self._active = (default, {"name": getattr(default, "name", "default"), "version": None, "source": "builtin"})
+        self._shadow = None
+        self._shadow_queue: queue.Queue = queue.Queue(maxsize=shadow_queue)
+        self._shadow_stats = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._shadow_worker, name="shadow-model", daemon=True).start()
+
+    # --- SERVING ---
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        model, _ = self._active
+        rul = model.predict(features)
+        shadow = self._shadow
+        if shadow is not None:
+            try:
+                self._shadow_queue.put_nowait((shadow, features, rul))
+            except queue.Full:
+                shadow[1]["dropped"] += 1  # never block serving on the candidate
+        return rul
+
+    def activate(self, model: RULModel, info: dict = None):
+        """Publish `model` as the served model (atomic reference swap)"""
+        self._active = (model, info or {"name": getattr(model, "name", "custom"), "version": None, "source": "api"})
+
+    # --- LOADING ---
+    def load(self, name: str, version: str = "latest", shadow: bool = False, background: bool = True):
+        """Fetch, cache, load and warm up a registry version, then activate it (or shadow it)"""
+        if self.registry is None:
+            raise RuntimeError("No model registry configured (set MLFLOW_TRACKING_URI or MODEL_REGISTRY_DIR)")
+        validate_model_ref(name, version)
+        key = f"{name}/{version}"
+        with self._lock:
+            if key in self._loading and self._loading[key]["state"] == "loading":
+                return self._loading[key]
+            self._loading[key] = {"state": "loading", "shadow": shadow, "started": time.time()}
+        if background:
+            threading.Thread(target=self._load, args=(key, name, version, shadow),
+                             name=f"load-{name}", daemon=True).start()
+        else:
+            self._load(key, name, version, shadow)
+        return self._loading[key]
+
+    def _load(self, key: str, name: str, version: str, shadow: bool):
+        try:
+            version = self.registry.resolve(name, version)
+            path, source = self._cached(name, version)
+            model = load_artifact(path, name)
+            model.predict(np.zeros((8, len(FEATURE_NAMES))))  # warm-up: first-call costs stay off the request path
+            info = {"name": name, "version": version, "source": source, "loaded_at": time.time()}
+            if shadow:
+                self._shadow_stats = {"count": 0, "abs_diff_sum": 0.0, "abs_diff_max": 0.0,
+                                      "maintenance_disagreements": 0}
+                self._shadow = (model, {**info, "dropped": 0})
+            else:
+                self.activate(model, info)
+            self._loading[key] = {"state": "ready", "shadow": shadow, **info}
+            print(f"🧠 Model {name} v{version} {'shadowing' if shadow else 'serving'} ({source})")
+        except Exception as e:
+            self._loading[key] = {"state": "failed", "shadow": shadow, "error": str(e)}
+            print(f"❌ Model {key} failed to load: {e}")
+
+    def _cached(self, name: str, version: str):
+        """Local artifact directory for name/version, fetching it once into the cache"""
+        path = os.path.join(self.cache_dir, name, version)
+        if os.path.isdir(path):
+            return path, "cache"
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.registry.fetch(name, version, tmp)
+        try:
+            os.replace(tmp, path)  # another worker may have won the race; its copy is identical
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        return path, "registry"
+
+    # --- SHADOW ---
+    def promote_shadow(self) -> bool:
+        shadow = self._shadow
+        if shadow is None:
+            return False
+        model, info = shadow
+        self.activate(model, {k: v for k, v in info.items() if k != "dropped"})
+        self._shadow = None
+        return True
+
+    def clear_shadow(self):
+        self._shadow = None
+
+    def _shadow_worker(self):
+        while True:
+            shadow, features, served = self._shadow_queue.get()
+            if shadow is not self._shadow:
+                continue  # candidate was promoted or cleared meanwhile
+            model, info = shadow
+            t0 = time.perf_counter()
+            try:
+                candidate = np.asarray(model.predict(features), dtype=np.float64)
+            except Exception as e:
+                print(f"⚠️ Shadow model {info['name']} v{info['version']} failed: {e}")
+                continue
+            SHADOW_SECONDS.observe(f"{info['name']}/{info['version']}", time.perf_counter() - t0)
+            diff = np.abs(candidate - served)
+            stats = self._shadow_stats
+            stats["count"] += len(diff)
+            stats["abs_diff_sum"] += float(diff.sum())
+            stats["abs_diff_max"] = max(stats["abs_diff_max"], float(diff.max(initial=0.0)))
+            stats["maintenance_disagreements"] += int(((candidate < 30) != (served < 30)).sum())
+
+    def status(self) -> dict:
+        _, active = self._active
+        out = {"active": active, "loading": dict(self._loading), "shadow": None}
+        shadow = self._shadow
+        if shadow is not None:
+            stats = self._shadow_stats
+            n = stats.get("count", 0)
+            out["shadow"] = {
+                **shadow[1],
+                "scored": n,
+                "mean_abs_rul_diff": stats["abs_diff_sum"] / n if n else None,
+                "max_abs_rul_diff": stats.get("abs_diff_max"),
+                "maintenance_disagreement_rate": stats["maintenance_disagreements"] / n if n else None,
+            }
+        return out
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+
+class CapacityExceeded(ValueError):
+    """One update touches more distinct vehicles than a store can hold"""
+
+
+class SlotAllocator:
+    """Maps vehicle ids to fixed array slots, evicting the least recently used id when full.
+
+    Per-vehicle stores keep their state in preallocated NumPy arrays indexed by slot,
+    so memory is fixed by `capacity` no matter how many vehicles pass through.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, vehicle_id: str):
+        return vehicle_id in self._slots
+
+    def get(self, vehicle_id: str):
+        """Slot of a known vehicle (without touching LRU order), or None"""
+        return self._slots.get(vehicle_id)
+
+    def acquire(self, vehicle_ids: Iterable[str]) -> Tuple[List[int], List[int], List[str]]:
+        """Resolve slots for `vehicle_ids`, marking them most recently used.
+
+        Returns (slot per id, newly assigned slots that must be reset, evicted ids).
+        Raises CapacityExceeded if one call needs more distinct vehicles than `capacity`.
+        """
+        vehicle_ids = list(vehicle_ids)
+        if len(vehicle_ids) > self.capacity and len(set(vehicle_ids)) > self.capacity:
+            raise CapacityExceeded(f"more than {self.capacity} distinct vehicles in one update")
+
+        slots, fresh, evicted = [], [], []
+        lookup = self._slots
+        for vid in vehicle_ids:
+            slot = lookup.get(vid)
+            if slot is not None:
+                lookup.move_to_end(vid)
+            else:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    old_id, slot = lookup.popitem(last=False)
+                    evicted.append(old_id)
+                lookup[vid] = slot
+                fresh.append(slot)
+            slots.append(slot)
+        return slots, fresh, evicted
+
+
+def occurrence_rank(slots: np.ndarray):
+    """Per-row repeat number of its slot, or None when all slots are distinct.
+
+    Rows with the same rank touch each slot at most once, so a batch can be applied
+    round by round with fancy-index writes that never collide.
+    """
+    if len(np.unique(slots)) == len(slots):
+        return None
+    seen = {}
+    rank = np.empty(len(slots), dtype=np.int32)
+    for i, s in enumerate(slots.tolist()):
+        rank[i] = seen.get(s, 0)
+        seen[s] = rank[i] + 1
+    return rank
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict
+
+
+class FakeSupplier:
+    """Local stand-in for the supplier API: waits `latency` seconds per order and logs it.
+
+    The last `keep` orders are kept in `orders` for inspection.
+    """
+
+    def __init__(self, latency: float = 1.0, keep: int = 1000):
+        self.latency = latency
+        self.orders = deque(maxlen=keep)
+
+    async def place_order(self, part_id: str, quantity: int):
+        await asyncio.sleep(self.latency)  # Simulate network
+        self.orders.append((part_id, quantity))
+        print(f"⚡ [SUPPLIER] ORDER SENT: {quantity} x {part_id}")
+
+
+class SupplierDispatcher:
+    """Coalesces out-of-stock demand into one supplier order per part per flush window.
+
+    `submit` only adds units to the part's pending demand, so it is cheap enough to
+    call from the request path. Every `flush_interval` the pending demand of each
+    part becomes a single order; a part whose previous order is still in flight
+    keeps accumulating until it returns. At most `max_concurrency` orders run at once.
+    `submit` must be called from the event loop the dispatcher runs on.
+    """
+
+    def __init__(self, supplier, flush_interval: float = 1.0, max_concurrency: int = 4):
+        self.supplier = supplier
+        self.flush_interval = flush_interval
+        self.max_concurrency = max_concurrency
+        self._limit = None  # created on the dispatcher's loop
+        self._pending: Dict[str, int] = {}
+        self._first_seen: Dict[str, float] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._task = None
+        self._stats = {
+            "requests": 0, "orders_sent": 0, "orders_failed": 0, "units_ordered": 0,
+            "flush_latency_total": 0.0, "flush_latency_max": 0.0, "flush_latency_last": 0.0,
+        }
+
+    def submit(self, part_id: str, quantity: int = 1):
+        if quantity <= 0:
+            return
+        self._pending[part_id] = self._pending.get(part_id, 0) + quantity
+        self._first_seen.setdefault(part_id, time.perf_counter())
+        self._stats["requests"] += 1
+        if self._task is None:
+            self.start()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop, send whatever is still pending and wait for in-flight orders"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Parts with an order in flight need a second round once it returns; failures are not retried forever
+        for _ in range(3):
+            if not (self._pending or self._in_flight):
+                break
+            self.flush()
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Turn pending demand into orders for every part with no order in flight"""
+        if self._limit is None:
+            self._limit = asyncio.Semaphore(self.max_concurrency)
+        for part_id in list(self._pending):
+            if part_id in self._in_flight:
+                continue
+            quantity = self._pending.pop(part_id)
+            first_seen = self._first_seen.pop(part_id)
+            self._in_flight[part_id] = asyncio.get_running_loop().create_task(
+                self._send(part_id, quantity, first_seen))
+
+    async def _send(self, part_id: str, quantity: int, first_seen: float):
+        try:
+            async with self._limit:
+                await self.supplier.place_order(part_id, quantity)
+        except Exception as e:
+            # Put the demand back so the next flush retries it
+            print(f"❌ [SUPPLIER] Order for {quantity} x {part_id} failed: {e}")
+            self._stats["orders_failed"] += 1
+            self._pending[part_id] = self._pending.get(part_id, 0) + quantity
+            self._first_seen[part_id] = min(first_seen, self._first_seen.get(part_id, first_seen))
+        else:
+            latency = time.perf_counter() - first_seen
+            self._stats["orders_sent"] += 1
+            self._stats["units_ordered"] += quantity
+            self._stats["flush_latency_total"] += latency
+            self._stats["flush_latency_last"] = latency
+            self._stats["flush_latency_max"] = max(self._stats["flush_latency_max"], latency)
+        finally:
+            self._in_flight.pop(part_id, None)
+
+    def metrics(self) -> dict:
+        stats = self._stats
+        sent = stats["orders_sent"]
+        return {
+            "queue_depth": len(self._pending),
+            "queued_units": sum(self._pending.values()),
+            "queued_by_part": dict(self._pending),
+            "in_flight": sorted(self._in_flight),
+            "requests": stats["requests"],
+            "orders_sent": sent,
+            "orders_failed": stats["orders_failed"],
+            "units_ordered": stats["units_ordered"],
+            "flush_latency_avg_s": stats["flush_latency_total"] / sent if sent else 0.0,
+            "flush_latency_max_s": stats["flush_latency_max"],
+            "flush_latency_last_s": stats["flush_latency_last"],
+        }
@@ -1,50 +1,208 @@
-import pandas as pd
-import requests
+import argparse
+import asyncio
+import json
+import os
+import sys
 import time
 
-API_URL = "http://localhost:8000/predict"
-DATA_PATH = "data/train_FD001.txt"
+import httpx
+import numpy as np
 
-def stream_data():
-    print(f"🚀 Loading NASA Data from {DATA_PATH}...")
-    try:
-        # Load NASA data (Space separated)
-        df = pd.read_csv(DATA_PATH, sep=r"\s+", header=None)
-    except FileNotFoundError:
-        print("❌ Data file not found! Run 'python data/download_data.py'")
-        return
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+import cmapss  # noqa: E402
+
+API_URL = "http://localhost:8000"
+DATA_DIR = "data"
+DATASETS = cmapss.DATASETS
+KAFKA_BOOTSTRAP = "localhost:19092"
+SENSOR_TOPIC = "fleet-sensors"
+
+
+def load_fleet(data_dir: str, datasets):
+    """Load every engine of the given CMAPSS training sets as replay-ready columns.
+
+    Rows are ordered cycle by cycle across the whole fleet, so replaying them in
+    order makes all engines degrade side by side. Reads the memory-mapped cache
+    (built on first use) instead of parsing the text files.
+    """
+    present = cmapss.available(data_dir, "train", datasets)
+    for name in set(datasets) - set(present):
+        print(f"⚠️ Skipping {name}: {os.path.join(data_dir, f'train_{name}.txt')} not found")
+    if not present:
+        return None
+
+    tables = [cmapss.load_table("train", name, data_dir, os.path.join(data_dir, "cache")) for name in present]
+    units = np.concatenate([t.units for t in tables])
+    cycles = np.concatenate([t.cycles for t in tables])
+    dataset_idx = np.concatenate([np.full(len(t), i) for i, t in enumerate(tables)])
+    sensors = np.concatenate([t.sensors for t in tables])
+    order = np.lexsort((units, dataset_idx, cycles))
+
+    # DATA MAPPING & NORMALIZATION
+    # We need to scale NASA data to trigger our API thresholds (Temp > 400)
+    # NASA Sensor 4 -> Map to Temp (300-450)
+    scaled_temp = 320 + (sensors[:, 3].astype(np.float64) - 1300) * 15
+    # NASA Sensor 11 -> Map to Vibration (0.1 - 0.8)
+    scaled_vib = np.abs((sensors[:, 10].astype(np.float64) - 47) / 1.5)
 
-    # Filter for Engine #1 only (to show degradation)
-    engine_data = df[df[0] == 1]
-    print(f"📡 Streaming {len(engine_data)} cycles for Engine 1...")
-
-    for index, row in engine_data.iterrows():
-        # DATA MAPPING & NORMALIZATION
-        # We need to scale NASA data to trigger our API thresholds (Temp > 400)
-        
-        # NASA Col 8 (Sensor 4) -> Map to Temp (300-450)
-        raw_temp = row[8]
-        scaled_temp = 320 + (raw_temp - 1300) * 15 
-        
-        # NASA Col 15 (Sensor 11) -> Map to Vibration (0.1 - 0.8)
-        raw_vib = row[15]
-        scaled_vib = (raw_vib - 47) / 1.5
-
-        payload = {
-            "vehicle_id": f"NASA-ENG-1",
-            "sensor_1": float(row[5]),        # RPM
-            "sensor_2": abs(float(scaled_vib)), # Vib
-            "sensor_3": float(scaled_temp),     # Temp
-            "timestamp": time.strftime("%H:%M:%S")
+    # One id per engine, repeated over its rows (tables are grouped by engine)
+    vehicle_ids = np.concatenate([
+        np.repeat([f"NASA-{name}-ENG-{u}" for u in t.engine_ids], np.diff(t.offsets))
+        for name, t in zip(present, tables)
+    ])
+    return {
+        "vehicle_id": vehicle_ids[order].tolist(),
+        "cycle": cycles[order].tolist(),
+        "sensor_1": sensors[order, 0].astype(np.float64).tolist(),  # RPM
+        "sensor_2": scaled_vib[order].tolist(),                      # Vib
+        "sensor_3": scaled_temp[order].tolist(),                     # Temp
+        "engines": sum(t.n_engines for t in tables),
+    }
+
+
+def build_payloads(fleet, start: int, stop: int):
+    timestamp = time.strftime("%H:%M:%S")
+    return [
+        {
+            "vehicle_id": fleet["vehicle_id"][i],
+            "sensor_1": fleet["sensor_1"][i],
+            "sensor_2": fleet["sensor_2"][i],
+            "sensor_3": fleet["sensor_3"][i],
+            "timestamp": timestamp,
         }
+        for i in range(start, stop)
+    ]
+
+
+class ReplayStats:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.requests = 0
+        self.latency_total = 0.0
+        self.started = time.perf_counter()
 
+    def report(self, final: bool = False):
+        elapsed = time.perf_counter() - self.started
+        rate = self.sent / elapsed if elapsed else 0.0
+        avg_ms = 1000 * self.latency_total / self.requests if self.requests else 0.0
+        prefix = "✅ Done" if final else "📡"
+        print(f"{prefix} {self.sent} readings sent, {self.failed} failed, "
+              f"{rate:,.0f} readings/s, {avg_ms:.1f} ms/request")
+
+
+async def send_worker(client: httpx.AsyncClient, queue: asyncio.Queue, stats: ReplayStats):
+    while True:
+        payloads = await queue.get()
+        if payloads is None:
+            return
+        if len(payloads) == 1:
+            path, body = "/predict", payloads[0]
+        else:
+            path, body = "/predict/batch", {"readings": payloads}
+        t0 = time.perf_counter()
         try:
-            requests.post(API_URL, json=payload)
-            print(f"Sent Cycle {int(row[1])}: Temp={scaled_temp:.1f} Vib={scaled_vib:.2f}")
-        except:
-            print("❌ API Down")
+            resp = await client.post(path, content=json.dumps(body),
+                                     headers={"content-type": "application/json"})
+            resp.raise_for_status()
+            stats.sent += len(payloads)
+        except httpx.HTTPError:
+            stats.failed += len(payloads)
+        stats.requests += 1
+        stats.latency_total += time.perf_counter() - t0
+
+
+async def replay(fleet, url: str, rate: float, batch_size: int, concurrency: int, limit: int = 0):
+    """Replay the fleet at `rate` readings/s (0 = as fast as possible) over pooled keep-alive connections."""
+    total = len(fleet["vehicle_id"])
+    if limit:
+        total = min(total, limit)
+    chunks = range(0, total, batch_size)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    stats = ReplayStats()
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        # Bounded queue: if the API falls behind, the pacer waits instead of buffering everything
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        workers = [asyncio.create_task(send_worker(client, queue, stats)) for _ in range(concurrency)]
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_report = start + 1
+        for first in chunks:
+            if rate:
+                # Release every chunk whose deadline has passed; sleep only when clearly ahead
+                delay = start + first / rate - loop.time()
+                if delay > 0.001:
+                    await asyncio.sleep(delay)
+            await queue.put(build_payloads(fleet, first, min(first + batch_size, total)))
+            if loop.time() >= next_report:
+                stats.report()
+                next_report += 1
+
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    stats.report(final=True)
+    return stats
+
+
+def replay_to_kafka(fleet, bootstrap: str, topic: str, rate: float, limit: int = 0):
+    """Produce the fleet to a Kafka/Redpanda topic, keyed by vehicle so each truck stays in order"""
+    from kafka import KafkaProducer
+
+    producer = KafkaProducer(bootstrap_servers=bootstrap, linger_ms=5, batch_size=256 * 1024)
+    total = len(fleet["vehicle_id"])
+    if limit:
+        total = min(total, limit)
+
+    stats = ReplayStats()
+    next_report = stats.started + 1
+    for first in range(0, total, 1000):
+        if rate:
+            delay = stats.started + first / rate - time.perf_counter()
+            if delay > 0.001:
+                time.sleep(delay)
+        for payload in build_payloads(fleet, first, min(first + 1000, total)):
+            producer.send(topic, key=payload["vehicle_id"].encode(), value=json.dumps(payload).encode())
+            stats.sent += 1
+        if time.perf_counter() >= next_report:
+            stats.report()
+            next_report += 1
+    producer.flush()
+    stats.report(final=True)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay NASA CMAPSS engines against the serving API")
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--datasets", nargs="+", default=DATASETS, choices=DATASETS)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Readings per second (0 = unthrottled)")
+    parser.add_argument("--batch-size", type=int, default=1, help=">1 sends readings to /predict/batch")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent in-flight requests")
+    parser.add_argument("--limit", type=int, default=0, help="Stop after this many readings (0 = all)")
+    parser.add_argument("--sink", choices=["http", "kafka"], default="http",
+                        help="POST to the API or produce to the sensor topic")
+    parser.add_argument("--kafka-bootstrap", default=KAFKA_BOOTSTRAP)
+    parser.add_argument("--topic", default=SENSOR_TOPIC)
+    args = parser.parse_args()
+
+    print(f"🚀 Loading NASA Data from {args.data_dir}...")
+    fleet = load_fleet(args.data_dir, args.datasets)
+    if fleet is None:
+        print("❌ Data file not found! Run 'python data/download_data.py'")
+        return
+
+    print(f"📡 Streaming {len(fleet['vehicle_id'])} cycles for {fleet['engines']} engines "
+          f"at {args.rate or 'max'} readings/s...")
+    if args.sink == "kafka":
+        replay_to_kafka(fleet, args.kafka_bootstrap, args.topic, args.rate, args.limit)
+        return
+    asyncio.run(replay(fleet, args.url, args.rate, max(1, args.batch_size),
+                       max(1, args.concurrency), args.limit))
 
-        time.sleep(1) # Send 1 data point per second
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The serving modules import each other by plain name (the app runs as a script from serving/)
+sys.path.insert(0, os.path.join(ROOT, "serving"))
+sys.path.insert(0, os.path.join(ROOT, "data"))
+# Importing the app opens the default inventory store: keep it out of the working tree
+os.environ.setdefault("INVENTORY_PATH", tempfile.mkdtemp(prefix="inventory-test-"))
+
+TEST_STOCK = {"PART_BRAKE_PAD": 5, "PART_ENGINE_BELT": 10, "PART_FILTER": 20}
+
+
+@pytest.fixture
+def reset_api(monkeypatch):
+    """reset(): install fresh in-memory stores, dispatcher and feed in the serving app module"""
+    import app as serving_app
+    from broadcast import Broadcaster
+    from features import FeatureStore
+    from fleet_state import FleetState
+    from inventory import MemoryInventory
+    from supplier import FakeSupplier, SupplierDispatcher
+
+    def reset():
+        monkeypatch.setattr(serving_app, "inventory", MemoryInventory(None, TEST_STOCK))
+        monkeypatch.setattr(serving_app, "feature_store", FeatureStore(window=30, capacity=1000))
+        monkeypatch.setattr(serving_app, "fleet_state", FleetState(capacity=1000, history=60))
+        monkeypatch.setattr(serving_app, "_published_inventory", {})
+        monkeypatch.setattr(serving_app, "broadcaster", Broadcaster(
+            serving_app.build_fleet_delta, serving_app.build_fleet_snapshot, interval=3600))
+        monkeypatch.setattr(serving_app, "supplier_dispatcher", SupplierDispatcher(
+            FakeSupplier(latency=0.0), flush_interval=3600))
+        return serving_app
+
+    return reset
+
+
+@pytest.fixture
+def api(reset_api):
+    """The serving app module with fresh state"""
+    return reset_api()
+
+
+@pytest.fixture
+def call_api(api):
+    """run(scenario): await scenario(client) against the app in-process (httpx.ASGITransport)"""
+    import httpx
+
+    async def drive(scenario):
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await scenario(client)
+
+    return lambda scenario: asyncio.run(drive(scenario))
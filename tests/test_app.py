@@ -0,0 +1,139 @@
+import json
+
+import numpy as np
+import pytest
+
+from conftest import TEST_STOCK
+
+
+def reading(vehicle_id: str, vib: float, temp: float, cycle: int) -> dict:
+    return {"vehicle_id": vehicle_id, "sensor_1": 6000.0, "sensor_2": vib, "sensor_3": temp, "timestamp": f"c{cycle}"}
+
+
+def fleet_tick_readings():
+    """Repeated vehicle ids; brake pads (stock 5) run out partway through"""
+    readings = []
+    for cycle in range(4):
+        readings.append(reading("TRUCK-1", 0.8, 350.0, cycle))              # vibration: brake pad
+        readings.append(reading("TRUCK-2", 0.2 + 0.1 * cycle, 360.0, cycle))
+        readings.append(reading("TRUCK-3", 0.9, 350.0, cycle))              # vibration: brake pad
+        readings.append(reading("TRUCK-4", 0.1, 380.0 + 10 * cycle, cycle))
+    readings.append(reading("TRUCK-5", 0.7, 450.0, 0))                      # both: filter
+    return readings
+
+
+def test_batch_matches_sequential_single_predictions(reset_api, call_api):
+    readings = fleet_tick_readings()
+
+    serving_app = reset_api()
+
+    async def batch(client):
+        resp = await client.post("/predict/batch", json={"readings": readings})
+        assert resp.status_code == 200
+        return resp.json()
+
+    batched = call_api(batch)
+    batch_stock = serving_app.inventory.snapshot()
+    batch_orders = serving_app.supplier_dispatcher.metrics()["queued_by_part"]
+
+    reset_api()
+
+    async def sequential(client):
+        out = []
+        for r in readings:
+            resp = await client.post("/predict", json=r)
+            assert resp.status_code == 200
+            out.append(resp.json())
+        return out
+
+    single = call_api(sequential)
+    single_stock = serving_app.inventory.snapshot()
+    single_orders = serving_app.supplier_dispatcher.metrics()["queued_by_part"]
+
+    strip = lambda r: (r["vehicle_id"], r["predicted_rul"], r["action_taken"])  # noqa: E731
+    assert [strip(r) for r in batched["results"]] == [strip(r) for r in single]
+    assert batched["inventory_snapshot"] == batch_stock == single_stock == single[-1]["inventory_snapshot"]
+    assert batch_orders == single_orders
+
+    # The scenario really exercises a stock-out: some brake pads reserved, the rest ordered
+    actions = [r["action_taken"] for r in single]
+    assert sum("Reserved PART_BRAKE_PAD" in a for a in actions) == TEST_STOCK["PART_BRAKE_PAD"]
+    assert batch_orders["PART_BRAKE_PAD"] == 8 - TEST_STOCK["PART_BRAKE_PAD"]
+
+
+def test_batch_over_store_capacity_is_rejected_up_front(api, call_api):
+    limit = api.batch_capacity()
+
+    async def scenario(client):
+        readings = [reading(f"V{i}", 0.1, 350.0, 0) for i in range(limit + 1)]
+        resp = await client.post("/predict/batch", json={"readings": readings})
+        assert resp.status_code == 413
+        # Repeats of the same vehicles fit, however many readings there are
+        resp = await client.post("/predict/batch", json={"readings": readings[:10] * 200})
+        assert resp.status_code == 200
+
+    call_api(scenario)
+    assert len(api.feature_store) == 10
+
+
+def test_model_errors_are_not_reported_as_oversized_batches(api, call_api, monkeypatch):
+    def broken(features):
+        raise ValueError("bad model output")
+
+    monkeypatch.setattr(api.model_manager, "predict", broken)
+
+    async def scenario(client):
+        with pytest.raises(ValueError):
+            await client.post("/predict/batch", json={"readings": [reading("V1", 0.1, 350.0, 0)]})
+
+    call_api(scenario)
+
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity", '"nan"', '"inf"'])
+def test_non_finite_sensor_values_are_rejected(api, call_api, value):
+    body = '{"vehicle_id": "V1", "sensor_1": 6000, "sensor_2": %s, "sensor_3": 350, "timestamp": "t"}' % value
+    headers = {"content-type": "application/json"}
+
+    async def scenario(client):
+        resp = await client.post("/predict", content=body, headers=headers)
+        assert resp.status_code == 422
+        assert resp.json()["detail"][0]["loc"] == ["body", "sensor_2"]
+        batch = '{"readings": [%s]}' % body
+        assert (await client.post("/predict/batch", content=batch, headers=headers)).status_code == 422
+        # The stream consumer drops the reading and keeps the valid ones
+        good = reading("V2", 0.1, 350.0, 0)
+        results = await api.score_stream_batch([body.encode(), json.dumps(good).encode()])
+        assert [r["vehicle_id"] for r in results] == ["V2"]
+
+    call_api(scenario)
+    assert api.feature_store.get("V1") is None
+    assert np.isfinite(api.feature_store.get("V2")).all()
+
+
+def test_concurrent_readings_of_one_vehicle_keep_arrival_order(api, call_api, monkeypatch):
+    import asyncio
+    import time
+
+    reserve_many = api.inventory.reserve_many
+
+    def slow_reserve_many(demand):
+        time.sleep(0.2)  # runs in the threadpool: the loop serves the second reading meanwhile
+        return reserve_many(demand)
+
+    monkeypatch.setattr(api.inventory, "reserve_many", slow_reserve_many)
+    first = {**reading("V1", 0.1, 450.0, 1), "sensor_1": 1.0}   # overheating: waits on an engine belt
+    second = {**reading("V1", 0.1, 350.0, 2), "sensor_1": 2.0}  # no sensor over its limit: no part
+
+    async def scenario(client):
+        pending = asyncio.ensure_future(client.post("/predict", json=first))
+        await asyncio.sleep(0.05)
+        second_action = (await client.post("/predict", json=second)).json()["action_taken"]
+        assert (await pending).json()["action_taken"] == "✅ Overheating: Reserved PART_ENGINE_BELT"
+        live = await client.get("/live_stream", params={"vehicle_id": "V1", "history": "true"})
+        return second_action, live.json()
+
+    second_action, state = call_api(scenario)
+    assert "PART_" not in second_action
+    assert state["timestamp"] == "c2" and state["action"] == second_action
+    assert state["history"]["sensor_1"] == [1.0, 2.0]
+    assert api.inventory.snapshot()["PART_ENGINE_BELT"] == TEST_STOCK["PART_ENGINE_BELT"] - 1
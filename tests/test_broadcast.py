@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from broadcast import Broadcaster
+
+
+def make_broadcaster(backlog: int = 8) -> Broadcaster:
+    """A feed whose delta is the sorted dirty ids, or None when nothing was touched"""
+    build_delta = lambda dirty: {"vehicles": sorted(dirty)} if dirty else None  # noqa: E731
+    return Broadcaster(build_delta, lambda: {"latest": None}, interval=3600, backlog=backlog)
+
+
+def test_one_frame_per_tick_is_shared_by_all_subscribers():
+    feed = make_broadcaster()
+
+    async def scenario():
+        streams = [feed.stream() for _ in range(3)]
+        for s in streams:
+            assert b"event: snapshot" in await s.__anext__()
+        assert feed.subscriber_count == 3
+        feed.touch(["V2", "V1"])
+        feed.publish()
+        frames = [await s.__anext__() for s in streams]
+        for s in streams:
+            await s.aclose()
+        return frames
+
+    frames = asyncio.run(scenario())
+    assert all(f is frames[0] for f in frames)
+    assert frames[0] == b'id: 1\nevent: delta\ndata: {"version":1,"vehicles":["V1","V2"]}\n\n'
+    assert feed.subscriber_count == 0
+
+
+def test_subscriber_with_a_full_queue_is_resynced_with_a_snapshot():
+    feed = make_broadcaster(backlog=2)
+
+    async def scenario():
+        slow, fast = feed.stream(), feed.stream()
+        await slow.__anext__(), await fast.__anext__()
+        fast_frames = []
+        for i in range(4):  # the slow subscriber reads nothing meanwhile
+            feed.touch([f"V{i}"])
+            feed.publish()
+            fast_frames.append(await fast.__anext__())
+        resync = await slow.__anext__()
+        feed.touch(["V9"])
+        feed.publish()
+        after = await slow.__anext__()
+        await slow.aclose(), await fast.aclose()
+        return fast_frames, resync, after
+
+    fast_frames, resync, after = asyncio.run(scenario())
+    assert [f.split(b"\n")[0] for f in fast_frames] == [b"id: 1", b"id: 2", b"id: 3", b"id: 4"]
+    # Queued deltas 1-2 are dropped with the overflow: the snapshot already covers them
+    assert resync == b'id: 4\nevent: snapshot\ndata: {"version":4,"latest":null}\n\n'
+    assert after.startswith(b"id: 5\nevent: delta\n")
+
+
+def test_empty_delta_does_not_bump_the_version_or_reach_subscribers():
+    feed = make_broadcaster()
+
+    async def scenario():
+        stream = feed.stream()
+        await stream.__anext__()
+        feed.publish()
+        feed.publish()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), 0.05)
+        await stream.aclose()
+
+    asyncio.run(scenario())
+    assert feed.version == 0
+    version, body = feed.snapshot()
+    assert version == 0 and body == b'{"version":0,"latest":null}'
+
+
+def test_snapshots_answer_not_modified_until_they_change(api, call_api, monkeypatch):
+    reading = {"vehicle_id": "V1", "sensor_1": 6000.0, "sensor_2": 0.8, "sensor_3": 350.0, "timestamp": "t0"}
+
+    async def etags(client, paths):
+        out = {}
+        for path in paths:
+            resp = await client.get(path)
+            assert resp.status_code == 200
+            etag = resp.headers["etag"]
+            again = await client.get(path, headers={"If-None-Match": etag})
+            assert again.status_code == 304 and again.headers["etag"] == etag and again.content == b""
+            out[path] = etag
+        return out
+
+    async def scenario(client):
+        await client.post("/predict", json={**reading, "vehicle_id": "V0"})
+        api.broadcaster.publish()
+        paths = ["/", "/live_stream", "/live_stream?vehicle_id=V0", "/fleet/snapshot"]
+        before = await etags(client, paths)
+        await client.post("/predict", json=reading)  # reserves a brake pad: inventory changes too
+        api.broadcaster.publish()
+        after = await etags(client, paths)
+        return before, after
+
+    before, after = call_api(scenario)
+    assert before["/live_stream?vehicle_id=V0"] == after["/live_stream?vehicle_id=V0"]
+    for path in ["/", "/live_stream", "/fleet/snapshot"]:
+        assert before[path] != after[path]
+    assert after["/fleet/snapshot"] == f'"{api.FEED_EPOCH}-v2"'
+
+    # After a restart the version counts from 0 again, but the old ETag must not match
+    monkeypatch.setattr(api, "FEED_EPOCH", "0" * 8)
+
+    async def restarted(client):
+        return await client.get("/fleet/snapshot", headers={"If-None-Match": after["/fleet/snapshot"]})
+
+    assert call_api(restarted).status_code == 200
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+import cmapss
+
+
+def write_table(path, rows):
+    np.savetxt(path, np.asarray(rows, dtype=np.float64), fmt="%.4f")
+
+
+def synthetic_rows(units, seed=0):
+    """CMAPSS-shaped rows (unit, cycle, settings, sensors), engines interleaved cycle by cycle"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for unit, cycles in units:
+        for cycle in range(1, cycles + 1):
+            rows.append([unit, cycle, *rng.normal(size=cmapss.N_SETTINGS), *rng.normal(size=cmapss.N_SENSORS)])
+    return sorted(rows, key=lambda row: row[1])  # stable: engines stay in their listed (unsorted) order
+
+
+@pytest.fixture
+def fd001(tmp_path):
+    data, cache = tmp_path / "data", tmp_path / "cache"
+    data.mkdir()
+    rows = synthetic_rows([(3, 4), (1, 6), (7, 2)])
+    write_table(data / "train_FD001.txt", rows)
+    write_table(data / "RUL_FD001.txt", [[112], [98], [69]])
+    return str(data), str(cache), rows
+
+
+def test_offset_index_slices_each_engine(fd001):
+    data, cache, rows = fd001
+    table = cmapss.load_table("train", "FD001", data, cache)
+    assert len(table) == len(rows) and table.n_engines == 3
+    assert table.engine_ids.tolist() == [1, 3, 7]
+    raw = np.asarray(rows, dtype=np.float32)
+    for unit, cycles in [(1, 6), (3, 4), (7, 2)]:
+        engine = table.engine(unit)
+        want = raw[raw[:, 0] == unit]
+        assert engine["cycles"].tolist() == list(range(1, cycles + 1))
+        np.testing.assert_allclose(engine["settings"], want[:, 2:2 + cmapss.N_SETTINGS], atol=1e-4)
+        np.testing.assert_allclose(engine["sensors"], want[:, 2 + cmapss.N_SETTINGS:], atol=1e-4)
+        assert isinstance(engine["sensors"], np.memmap)  # a view, not a copy
+    assert cmapss.load_rul("FD001", data, cache).tolist() == [112, 98, 69]
+
+
+def test_unchanged_source_is_not_rebuilt(fd001):
+    data, cache, _ = fd001
+    assert cmapss.build_cache(data, cache) == ["train_FD001", "RUL_FD001"]
+    assert cmapss.build_cache(data, cache) == []
+
+    # Touched but identical: the hash matches, only the recorded mtime moves
+    src = os.path.join(data, "train_FD001.txt")
+    os.utime(src, ns=(0, os.stat(src).st_mtime_ns + 10**9))
+    assert not cmapss.ensure_cached("train_FD001", data, cache)
+    assert cmapss.build_cache(data, cache) == []
+
+
+def test_changed_source_is_rebuilt(fd001):
+    data, cache, _ = fd001
+    cmapss.build_cache(data, cache)
+    src = os.path.join(data, "train_FD001.txt")
+    mtime = os.stat(src).st_mtime_ns
+    write_table(src, synthetic_rows([(2, 5)], seed=1))
+    os.utime(src, ns=(0, mtime))  # same mtime; size differs, so the hash is checked
+
+    assert cmapss.ensure_cached("train_FD001", data, cache)
+    table = cmapss.load_table("train", "FD001", data, cache)
+    assert table.engine_ids.tolist() == [2] and len(table) == 5
+
+
+@pytest.mark.parametrize("name, column", [
+    ("train_FD001", "sensors"),
+    ("train_FD001", "offsets"),
+    ("RUL_FD001", "rul"),
+])
+def test_missing_column_file_is_rebuilt(fd001, name, column):
+    data, cache, _ = fd001
+    cmapss.build_cache(data, cache)
+    os.remove(os.path.join(cache, f"{name}.{column}.npy"))
+
+    assert cmapss.build_cache(data, cache) == [name]
+    assert os.path.exists(os.path.join(cache, f"{name}.{column}.npy"))
+    assert cmapss.load_table("train", "FD001", data, cache).n_engines == 3
@@ -0,0 +1,134 @@
+import asyncio
+
+from consumer import InMemoryBroker, MicroBatchConsumer
+
+TOPIC = "fleet-sensors"
+
+
+def produce(broker: InMemoryBroker, n: int, start: int = 0):
+    for i in range(start, start + n):
+        broker.produce(TOPIC, str(i).encode(), key=f"V{i % 7}".encode())
+
+
+def total_committed(broker: InMemoryBroker, group: str = "serving") -> int:
+    return sum(broker.committed(group, TOPIC, p) for p in range(broker.partitions))
+
+
+async def consume_until(consumer: MicroBatchConsumer, done, timeout: float = 5.0):
+    """Run the consumer until done() holds (or timeout), then stop it cleanly"""
+    task = asyncio.create_task(consumer.run())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not done() and loop.time() < deadline:
+        await asyncio.sleep(0.005)
+    consumer.stop()
+    await task
+
+
+def make_consumer(source, handler, **kwargs):
+    kwargs = {"max_batch": 100, "max_wait": 0.005, "retry_backoff": 0.001, "max_backoff": 0.01, **kwargs}
+    return MicroBatchConsumer(source, handler, **kwargs)
+
+
+class FlakySource:
+    """Wraps a source and raises on the first `poll_failures` polls and `commit_failures` commits"""
+
+    def __init__(self, source, poll_failures: int = 0, commit_failures: int = 0):
+        self.source = source
+        self.poll_failures = poll_failures
+        self.commit_failures = commit_failures
+
+    def poll(self, max_records, timeout):
+        if self.poll_failures:
+            self.poll_failures -= 1
+            raise ConnectionError("broker unavailable")
+        return self.source.poll(max_records, timeout)
+
+    def commit(self, offsets):
+        if self.commit_failures:
+            self.commit_failures -= 1
+            raise RuntimeError("CommitFailedError: group rebalanced")
+        self.source.commit(offsets)
+
+    def close(self):
+        self.source.close()
+
+
+def test_every_record_is_handled_and_committed():
+    broker = InMemoryBroker(partitions=3)
+    produce(broker, 1050)
+    seen = []
+    consumer = make_consumer(broker.consumer(TOPIC), seen.extend)
+    asyncio.run(consume_until(consumer, lambda: len(seen) >= 1050))
+
+    assert sorted(int(v) for v in seen) == list(range(1050))
+    assert total_committed(broker) == 1050
+    assert consumer.stats["records"] == 1050
+    assert consumer.stats["state"] == "stopped"
+
+
+def test_failed_batch_is_retried_before_its_offsets_are_committed():
+    broker = InMemoryBroker()
+    produce(broker, 1050)
+    seen, calls = [], {"n": 0}
+
+    def handler(values):
+        calls["n"] += 1
+        if calls["n"] == 3:
+            raise RuntimeError("database is locked")
+        seen.extend(values)
+
+    consumer = make_consumer(broker.consumer(TOPIC), handler)
+    asyncio.run(consume_until(consumer, lambda: len(seen) >= 1050))
+
+    assert sorted(int(v) for v in seen) == list(range(1050))
+    assert total_committed(broker) == 1050
+    assert consumer.stats["batch_retries"] == 1
+
+
+def test_nothing_past_a_failing_batch_is_committed():
+    broker = InMemoryBroker()
+    produce(broker, 500)
+    seen = []
+
+    def handler(values):
+        if b"250" in values:
+            raise RuntimeError("database is locked")
+        seen.extend(values)
+
+    consumer = make_consumer(broker.consumer(TOPIC), handler, max_batch=50)
+    asyncio.run(consume_until(consumer, lambda: consumer.stats["batch_retries"] >= 3))
+
+    assert total_committed(broker) == 250
+    assert consumer.stats["state"] == "stopped"
+    assert consumer.stats["last_error"]
+
+    # A restarted consumer resumes at the failed batch once the handler recovers
+    resumed = []
+    consumer = make_consumer(broker.consumer(TOPIC), resumed.extend, max_batch=50)
+    asyncio.run(consume_until(consumer, lambda: len(resumed) >= 250))
+    assert sorted(int(v) for v in resumed) == list(range(250, 500))
+    assert total_committed(broker) == 500
+
+
+def test_broker_errors_back_off_and_recover():
+    broker = InMemoryBroker()
+    produce(broker, 300)
+    seen = []
+    source = FlakySource(broker.consumer(TOPIC), poll_failures=3, commit_failures=1)
+    consumer = make_consumer(source, seen.extend)
+
+    async def scenario():
+        task = asyncio.create_task(consumer.run())
+        while len(seen) < 300:
+            await asyncio.sleep(0.005)
+        produce(broker, 100, start=300)  # a later commit covers offsets whose commit failed
+        while total_committed(broker) < 400:
+            await asyncio.sleep(0.005)
+        consumer.stop()
+        await task
+
+    asyncio.run(asyncio.wait_for(scenario(), 5.0))
+    assert sorted(int(v) for v in seen) == list(range(400))
+    assert consumer.stats["source_errors"] == 4
+    assert "rebalanced" in consumer.stats["last_error"]
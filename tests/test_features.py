@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from features import CHANNELS, FEATURE_NAMES, FeatureStore
+
+
+class BruteForce:
+    """Reference features recomputed from each vehicle's full reading history"""
+
+    def __init__(self, window: int, alpha: float):
+        self.window = window
+        self.alpha = alpha
+        self.history = {}
+
+    def update(self, vehicle_id: str, y: np.ndarray) -> np.ndarray:
+        hist = self.history.setdefault(vehicle_id, [])
+        hist.append(np.asarray(y, dtype=np.float32).astype(np.float64))
+        win = np.array(hist[-self.window:])
+        ewma = hist[0]
+        for v in hist[1:]:
+            ewma = self.alpha * v + (1 - self.alpha) * ewma
+        if len(win) > 1:
+            slope = np.polyfit(np.arange(len(win)), win, 1)[0]
+        else:
+            slope = np.zeros(len(CHANNELS))
+        prev = hist[-2] if len(hist) > 1 else hist[-1]
+        per_channel = np.stack([win[-1], win.mean(axis=0), slope, ewma, win[-1] - prev], axis=1)
+        return per_channel.reshape(len(FEATURE_NAMES))
+
+    def forget(self, vehicle_id: str):
+        self.history.pop(vehicle_id, None)
+
+
+def assert_matches(got: np.ndarray, want: np.ndarray):
+    np.testing.assert_allclose(got, want, rtol=1e-6, atol=1e-6)
+
+
+def test_running_sums_match_brute_force_window():
+    rng = np.random.default_rng(0)
+    store, ref = FeatureStore(window=5, capacity=16), BruteForce(5, 0.2)
+    ids = [f"V{i}" for i in range(8)]
+    for _ in range(40):  # many window slides per vehicle
+        batch = list(rng.choice(ids, size=6, replace=False))
+        values = rng.normal([6000.0, 0.3, 380.0], [50.0, 0.05, 10.0], size=(6, 3))
+        features = store.update(batch, values)
+        for i, vid in enumerate(batch):
+            assert_matches(features[i], ref.update(vid, values[i]))
+
+
+def test_repeated_ids_in_one_batch_apply_in_order():
+    rng = np.random.default_rng(1)
+    store, ref = FeatureStore(window=4, capacity=8), BruteForce(4, 0.2)
+    batch = ["A", "B", "A", "A", "C", "B", "A", "A", "A"]
+    values = rng.normal(100.0, 5.0, size=(len(batch), 3))
+    features = store.update(batch, values)
+    for i, vid in enumerate(batch):
+        assert_matches(features[i], ref.update(vid, values[i]))
+    assert_matches(store.get("A"), features[len(batch) - 1])
+
+
+def test_evicted_vehicle_starts_a_fresh_window():
+    rng = np.random.default_rng(2)
+    store, ref = FeatureStore(window=3, capacity=2), BruteForce(3, 0.2)
+    for vid in ["A", "A", "A", "B", "B"]:
+        y = rng.normal(50.0, 1.0, size=3)
+        store.update([vid], [y])
+        ref.update(vid, y)
+
+    # A is least recently used, so C takes its slot
+    y = rng.normal(50.0, 1.0, size=3)
+    assert_matches(store.update(["C"], [y])[0], ref.update("C", y))
+    assert store.get("A") is None
+    ref.forget("A")
+
+    # A comes back with no trace of its old readings, evicting B
+    y = rng.normal(50.0, 1.0, size=3)
+    assert_matches(store.update(["A"], [y])[0], ref.update("A", y))
+    assert store.get("B") is None
+    assert len(store) == 2
+
+
+def test_batch_with_more_distinct_vehicles_than_capacity_is_rejected():
+    store = FeatureStore(window=3, capacity=2)
+    store.update(["A"], [[1.0, 2.0, 3.0]])
+    with pytest.raises(ValueError):
+        store.update(["B", "C", "D"], np.ones((3, 3)))
+    # Nothing was touched: A keeps its slot and features
+    assert store.get("A") is not None
+    assert len(store) == 1
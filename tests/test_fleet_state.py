@@ -0,0 +1,104 @@
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from fleet_state import HISTORY_FIELDS, FleetState
+
+
+class BruteForce:
+    """Reference fleet: LRU dict of latest state and full history, queries by scanning"""
+
+    def __init__(self, capacity: int, history: int):
+        self.capacity = capacity
+        self.latest = OrderedDict()
+        self.history = {}
+        self.rows = history
+
+    def update(self, vehicle_id: str, row: list, rul: float, maintenance: bool):
+        if vehicle_id in self.latest:
+            self.latest.move_to_end(vehicle_id)
+        elif len(self.latest) == self.capacity:
+            old, _ = self.latest.popitem(last=False)
+            del self.history[old]
+        self.latest[vehicle_id] = (int(rul), maintenance)
+        self.history.setdefault(vehicle_id, deque(maxlen=self.rows)).append(row)
+
+    def lowest_rul(self) -> list:
+        return sorted(rul for rul, _ in self.latest.values())
+
+    def needing_maintenance(self) -> set:
+        return {vid for vid, (_, maint) in self.latest.items() if maint}
+
+
+def random_batch(rng, ids, size):
+    batch = list(rng.choice(ids, size=size))  # with replacement: repeated ids in one batch
+    sensors = rng.normal([6000.0, 0.3, 380.0], [50.0, 0.2, 20.0], size=(size, 3))
+    rul = rng.integers(0, 40, size=size).astype(np.float64)  # few distinct buckets, many ties
+    return batch, sensors, rul, rul < 15
+
+
+def assert_matches(fleet: FleetState, ref: BruteForce):
+    assert len(fleet) == len(ref.latest)
+    for vid, (rul, maint) in ref.latest.items():
+        state = fleet.latest(vid)
+        assert state["vehicle_id"] == vid
+        assert state["prediction"]["rul"] == rul and state["prediction"]["maintenance"] == maint
+        want = np.array(ref.history[vid], dtype=np.float32)
+        got = fleet.recent(vid)
+        for i, name in enumerate(HISTORY_FIELDS):
+            np.testing.assert_array_equal(got[name], want[:, i])
+
+    for n in (1, 5, len(ref.latest) + 3):
+        got = fleet.lowest_rul(n)
+        assert [s["prediction"]["rul"] for s in got] == ref.lowest_rul()[:n]
+        assert len({s["vehicle_id"] for s in got}) == len(got)
+    assert {s["vehicle_id"] for s in fleet.needing_maintenance(limit=10_000)} == ref.needing_maintenance()
+    assert fleet.maintenance_count() == len(ref.needing_maintenance())
+
+    # Indexes hold exactly the live vehicles: no empty buckets, no evicted ids
+    assert fleet._bucket_keys == sorted(fleet._buckets)
+    assert all(fleet._buckets.values())
+    assert {vid for members in fleet._buckets.values() for vid in members} == set(ref.latest)
+    assert fleet._bucket_of == {vid: rul for vid, (rul, _) in ref.latest.items()}
+
+
+def test_indexes_match_brute_force_under_eviction_and_repeats():
+    rng = np.random.default_rng(0)
+    fleet, ref = FleetState(capacity=12, history=4), BruteForce(12, 4)
+    ids = [f"V{i}" for i in range(20)]  # more vehicles than slots: constant eviction
+    for _ in range(60):
+        batch, sensors, rul, maint = random_batch(rng, ids, size=int(rng.integers(1, 10)))
+        fleet.update_many(batch, ["t"] * len(batch), sensors, rul, maint, ["a"] * len(batch))
+        for i, vid in enumerate(batch):
+            ref.update(vid, [*sensors[i], rul[i]], rul[i], bool(maint[i]))
+        assert_matches(fleet, ref)
+
+
+def test_repeated_ids_keep_the_last_reading_and_full_history():
+    fleet = FleetState(capacity=4, history=3)
+    sensors = np.array([[1.0, 0.1, 300.0], [2.0, 0.2, 310.0], [3.0, 0.3, 320.0], [4.0, 0.4, 330.0]])
+    rul, maint = np.array([20.0, 9.0, 18.0, 5.0]), np.array([False, True, False, True])
+    states = fleet.update_many(["A", "B", "A", "A"], ["t0", "t1", "t2", "t3"], sensors, rul, maint,
+                               ["a0", "a1", "a2", "a3"])
+
+    assert [s["action"] for s in states] == ["a0", "a1", "a2", "a3"]
+    assert fleet.latest("A") is states[3] and fleet.latest() is states[3]
+    assert fleet.recent("A")["sensor_1"] == [1.0, 3.0, 4.0]
+    assert fleet.recent("A")["rul"] == [20.0, 18.0, 5.0]
+    assert [s["vehicle_id"] for s in fleet.lowest_rul(2)] == ["A", "B"]
+    assert fleet.maintenance_count() == 2
+
+    fleet.update_many(["A"], ["t4"], sensors[:1], np.array([25.0]), np.array([False]), ["a4"])
+    assert fleet.recent("A")["sensor_1"] == [3.0, 4.0, 1.0]  # ring buffer wrapped
+    assert fleet.maintenance_count() == 1
+    assert fleet._bucket_keys == [9, 25]
+
+
+def test_evicting_the_last_reporter_clears_it():
+    fleet = FleetState(capacity=2, history=2)
+    one = np.zeros((1, 3))
+    for vid in ["A", "B", "A", "C"]:
+        fleet.update_many([vid], ["t"], one, np.array([3.0]), np.array([True]), ["a"])
+    assert fleet.latest("B") is None and fleet.recent("B") is None
+    assert fleet.latest()["vehicle_id"] == "C"
+    assert {s["vehicle_id"] for s in fleet.needing_maintenance()} == {"A", "C"}
@@ -0,0 +1,114 @@
+import os
+import shutil
+import threading
+
+import pytest
+
+from inventory import InventoryStore, MemoryInventory, SQLiteInventory
+
+STOCK = {"PART_BRAKE_PAD": 5, "PART_FILTER": 20}
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        s = MemoryInventory(str(tmp_path / "state"), STOCK)
+    else:
+        s = SQLiteInventory(str(tmp_path / "inventory.db"), STOCK)
+    yield s
+    s.close()
+
+
+def test_interface_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        InventoryStore()
+
+
+def test_reserve_many_grants_what_is_in_stock(store):
+    assert store.reserve_many({"PART_BRAKE_PAD": 3, "PART_FILTER": 1}) == {"PART_BRAKE_PAD": 3, "PART_FILTER": 1}
+    assert store.reserve_many({"PART_BRAKE_PAD": 4, "PART_UNKNOWN": 2}) == {"PART_BRAKE_PAD": 2}
+    assert store.reserve_many({"PART_BRAKE_PAD": 1}) == {}
+    assert store.snapshot() == {"PART_BRAKE_PAD": 0, "PART_FILTER": 19}
+    assert "PART_UNKNOWN" not in store
+
+
+def test_single_reservation_is_all_or_nothing(store):
+    assert store.reserve("PART_BRAKE_PAD", 5)
+    assert not store.reserve("PART_BRAKE_PAD")
+    assert not store.reserve("PART_UNKNOWN")
+
+
+def test_concurrent_reservations_never_oversell(store):
+    granted = []
+
+    def worker():
+        for _ in range(50):
+            granted.append(store.reserve_many({"PART_BRAKE_PAD": 1, "PART_FILTER": 1}))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(g.get("PART_BRAKE_PAD", 0) for g in granted) == 5
+    assert sum(g.get("PART_FILTER", 0) for g in granted) == 20
+    assert store.snapshot() == {"PART_BRAKE_PAD": 0, "PART_FILTER": 0}
+
+
+# --- MEMORY BACKEND RECOVERY ---
+def reopen(directory, **kwargs) -> MemoryInventory:
+    return MemoryInventory(str(directory), STOCK, **kwargs)
+
+
+def test_restart_replays_snapshot_and_log(tmp_path):
+    inv = reopen(tmp_path, snapshot_every=3)
+    for _ in range(4):
+        inv.reserve("PART_FILTER")  # snapshot after the third, one entry left in the log
+    inv.set("PART_ENGINE_BELT", 7)
+    expected = inv.snapshot()
+    inv.close()
+
+    recovered = reopen(tmp_path, snapshot_every=3)
+    assert recovered.snapshot() == expected == {"PART_BRAKE_PAD": 5, "PART_FILTER": 16, "PART_ENGINE_BELT": 7}
+    # Recovered state keeps appending where it left off
+    recovered.reserve("PART_ENGINE_BELT", 2)
+    recovered.close()
+    assert reopen(tmp_path).get("PART_ENGINE_BELT") == 5
+
+
+@pytest.mark.parametrize("torn", [b'{"seq":99,"op":"reserve","parts":{"PART_FIL', b"garbage\n"])
+def test_torn_final_entry_is_dropped(tmp_path, torn):
+    inv = reopen(tmp_path)
+    inv.reserve("PART_BRAKE_PAD", 2)
+    inv.close()
+    with open(tmp_path / "inventory.log", "ab") as f:
+        f.write(torn)
+
+    recovered = reopen(tmp_path)
+    assert recovered.get("PART_BRAKE_PAD") == 3
+    assert recovered.get("PART_FILTER") == 20
+    recovered.reserve("PART_FILTER", 1)
+    recovered.close()
+
+    # The torn bytes were truncated, so the new entry is readable after another restart
+    again = reopen(tmp_path)
+    assert again.snapshot() == {"PART_BRAKE_PAD": 3, "PART_FILTER": 19}
+
+
+def test_crash_between_snapshot_and_log_truncation_applies_nothing_twice(tmp_path):
+    inv = reopen(tmp_path)
+    inv.reserve("PART_FILTER", 10)
+    inv.reserve("PART_FILTER", 3)
+    log = tmp_path / "inventory.log"
+    stale_log = tmp_path / "stale.log"
+    shutil.copy(log, stale_log)
+    inv.write_snapshot()
+    inv.close()
+    # Simulate the crash: the new snapshot is in place but the old log was never truncated
+    os.replace(stale_log, log)
+
+    recovered = reopen(tmp_path)
+    assert recovered.get("PART_FILTER") == 7
+    recovered.reserve("PART_FILTER", 2)
+    recovered.close()
+    assert reopen(tmp_path).get("PART_FILTER") == 5
@@ -0,0 +1,80 @@
+import re
+
+import pytest
+
+from metrics import Histogram
+
+SAMPLE = re.compile(r'^(\w+)\{(.*)\} (\S+)$')
+STAGES = ["validation", "scoring", "inventory", "state_update", "background"]
+
+
+def parse(text: str) -> dict:
+    """{(metric, frozenset of label pairs): value} for every labelled sample line"""
+    samples = {}
+    for line in text.splitlines():
+        m = SAMPLE.match(line)
+        if m:
+            labels = frozenset(re.findall(r'(\w+)="([^"]*)"', m.group(2)))
+            samples[(m.group(1), labels)] = float(m.group(3))
+    return samples
+
+
+def series(samples: dict, name: str, label: str, value: str):
+    """(cumulative bucket counts in `le` order, count) of one histogram series"""
+    buckets = []
+    for (metric, labels), v in samples.items():
+        labels = dict(labels)
+        if metric == f"{name}_bucket" and labels.get(label) == value:
+            le = float("inf") if labels["le"] == "+Inf" else float(labels["le"])
+            buckets.append((le, v))
+    count = samples.get((f"{name}_count", frozenset({(label, value)})), 0.0)
+    return [v for _, v in sorted(buckets)], count
+
+
+def reading(vehicle_id: str) -> dict:
+    # Vibrating and at low RUL: needs a brake pad
+    return {"vehicle_id": vehicle_id, "sensor_1": 6000.0, "sensor_2": 0.8, "sensor_3": 350.0, "timestamp": "t"}
+
+
+def test_metrics_endpoint_reports_stages_and_routes(call_api):
+    async def scenario(client):
+        before = parse((await client.get("/metrics")).text)
+        assert (await client.post("/predict", json=reading("V0"))).status_code == 200
+        # More brake pads than the test stock: the shortfall goes to the supplier in the background
+        batch = {"readings": [reading(f"V{i}") for i in range(8)]}
+        assert (await client.post("/predict/batch", json=batch)).status_code == 200
+        assert (await client.get("/no/such/route")).status_code == 404
+        assert (await client.get("/stream/no-such-feed")).status_code == 404
+        return before, parse((await client.get("/metrics")).text)
+
+    before, after = call_api(scenario)
+
+    for stage in STAGES:
+        buckets, count = series(after, "request_stage_seconds", "stage", stage)
+        assert count > series(before, "request_stage_seconds", "stage", stage)[1]
+        assert buckets == sorted(buckets) and buckets[-1] == count  # cumulative; +Inf holds everything
+
+    def requests(path):
+        return series(after, "request_duration_seconds", "path", path)[1] \
+            - series(before, "request_duration_seconds", "path", path)[1]
+
+    assert requests("/predict") == 1 and requests("/predict/batch") == 1
+    assert requests("other") == 1
+    assert not any(dict(labels).get("path", "").startswith("/stream") for _, labels in after)
+
+
+@pytest.mark.parametrize("seconds, le", [
+    (0.0, "1e-05"),
+    (0.001, "0.001"),     # a bucket's upper bound is inclusive
+    (0.0011, "0.0025"),
+    (5.0, "5.0"),
+    (7.5, "+Inf"),
+])
+def test_histogram_bucket_placement(seconds, le):
+    hist = Histogram("t_seconds", "test", "stage")
+    hist.observe("x", seconds)
+    samples = parse("\n".join(hist.render()))
+    first = next(b for b in hist.render() if b.endswith(" 1") and "_bucket" in b)
+    assert f'le="{le}"' in first
+    assert samples[("t_seconds_count", frozenset({("stage", "x")}))] == 1
+    assert samples[("t_seconds_sum", frozenset({("stage", "x")}))] == seconds
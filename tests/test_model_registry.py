@@ -0,0 +1,50 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from features import FEATURE_NAMES
+from model import TrendRULModel
+from model_registry import LocalRegistry, ModelManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    registry = tmp_path / "registry"
+    for version, max_rul in [("1", 111.0), ("2", 222.0)]:
+        os.makedirs(registry / "rul" / version)
+        with open(registry / "rul" / version / "model.pkl", "wb") as f:
+            pickle.dump(TrendRULModel(max_rul=max_rul), f)
+    return ModelManager(TrendRULModel(), LocalRegistry(str(registry)), cache_dir=str(tmp_path / "cache"))
+
+
+def served_rul(manager: ModelManager) -> float:
+    return float(manager.predict(np.zeros((1, len(FEATURE_NAMES))))[0])
+
+
+def test_latest_version_is_cached_and_activated(manager, tmp_path):
+    status = manager.load("rul", background=False)
+    assert status["state"] == "ready"
+    assert status["version"] == "2" and status["source"] == "registry"
+    assert served_rul(manager) == 222.0
+    assert os.path.exists(tmp_path / "cache" / "rul" / "2" / "model.pkl")
+
+    assert manager.load("rul", "2", background=False)["source"] == "cache"
+
+
+@pytest.mark.parametrize("name, version", [
+    ("../../x", "latest"),
+    ("rul/../../x", "1"),
+    ("..", "1"),
+    ("rul", "../1"),
+    ("rul", "1/../../x"),
+    ("rul", "1\n"),
+    ("rul'", "latest"),
+    ("", "latest"),
+])
+def test_unsafe_names_and_versions_are_rejected(manager, name, version):
+    with pytest.raises(ValueError):
+        manager.load(name, version, background=False)
+    assert manager.status()["loading"] == {}
+    assert served_rul(manager) == 200.0  # built-in model still serves
@@ -0,0 +1,91 @@
+import asyncio
+
+from supplier import FakeSupplier, SupplierDispatcher
+
+
+def make_dispatcher(latency: float = 0.0, **kwargs):
+    # Long flush interval: the tests call flush() themselves
+    supplier = FakeSupplier(latency=latency)
+    return supplier, SupplierDispatcher(supplier, flush_interval=3600, **kwargs)
+
+
+def test_demand_is_coalesced_into_one_order_per_part():
+    supplier, dispatcher = make_dispatcher()
+
+    async def scenario():
+        for _ in range(1000):
+            dispatcher.submit("PART_BRAKE_PAD")
+        dispatcher.submit("PART_FILTER", 3)
+        dispatcher.submit("PART_FILTER", 0)  # ignored
+        dispatcher.flush()
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert sorted(supplier.orders) == [("PART_BRAKE_PAD", 1000), ("PART_FILTER", 3)]
+    metrics = dispatcher.metrics()
+    assert metrics["requests"] == 1001
+    assert metrics["orders_sent"] == 2
+    assert metrics["units_ordered"] == 1003
+    assert metrics["queue_depth"] == 0
+
+
+def test_part_with_order_in_flight_accumulates_until_it_returns():
+    supplier, dispatcher = make_dispatcher(latency=0.05)
+
+    async def scenario():
+        dispatcher.submit("PART_BRAKE_PAD", 2)
+        dispatcher.flush()
+        await asyncio.sleep(0)  # let the first order start
+        dispatcher.submit("PART_BRAKE_PAD", 5)
+        dispatcher.submit("PART_BRAKE_PAD", 1)
+        dispatcher.submit("PART_FILTER", 4)
+        dispatcher.flush()
+
+        # The filter order goes out; the brake pads wait behind the in-flight order
+        metrics = dispatcher.metrics()
+        assert metrics["queued_by_part"] == {"PART_BRAKE_PAD": 6}
+        assert metrics["in_flight"] == ["PART_BRAKE_PAD", "PART_FILTER"]
+
+        await asyncio.sleep(0.1)
+        assert list(supplier.orders) == [("PART_BRAKE_PAD", 2), ("PART_FILTER", 4)]
+        dispatcher.flush()
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert list(supplier.orders) == [("PART_BRAKE_PAD", 2), ("PART_FILTER", 4), ("PART_BRAKE_PAD", 6)]
+
+
+def test_failed_order_is_requeued():
+    class FailingOnce(FakeSupplier):
+        failed = False
+
+        async def place_order(self, part_id, quantity):
+            if not self.failed:
+                self.failed = True
+                raise ConnectionError("supplier down")
+            await super().place_order(part_id, quantity)
+
+    supplier = FailingOnce(latency=0.0)
+    dispatcher = SupplierDispatcher(supplier, flush_interval=3600)
+
+    async def scenario():
+        dispatcher.submit("PART_ENGINE_BELT", 3)
+        dispatcher.flush()
+        await asyncio.sleep(0.01)
+        dispatcher.submit("PART_ENGINE_BELT", 2)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert list(supplier.orders) == [("PART_ENGINE_BELT", 5)]
+    assert dispatcher.metrics()["orders_failed"] == 1
+
+
+def test_fake_supplier_keeps_a_bounded_order_log():
+    supplier = FakeSupplier(latency=0.0, keep=3)
+
+    async def scenario():
+        for i in range(10):
+            await supplier.place_order("PART_FILTER", i)
+
+    asyncio.run(scenario())
+    assert list(supplier.orders) == [("PART_FILTER", 7), ("PART_FILTER", 8), ("PART_FILTER", 9)]